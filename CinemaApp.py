@@ -4,13 +4,19 @@ from models.ScreeningRoom import ScreeningRoom
 from models.Screening import Screening
 from models.Reservation import Reservation
 
-from data_storage.DataStorage import DataStorage
+from data_storage.DataStorage import DataStorage, DataStorageError
+from data_storage.JournalStorage import JournalStorage
+from data_storage.BackgroundWriter import BackgroundWriter
 
 from logics.ReservationManager import ReservationManager
 from logics.AdminManager import AdminManager
+from logics.HoldManager import HoldManager
+from instrumentation.Metrics import metrics, timed
+
+from SeatMapCanvas import SeatMapCanvas
 
 import tkinter as tk
-from tkinter import messagebox, ttk
+from tkinter import filedialog, messagebox, ttk
 import json
 import os
 from datetime import datetime, timedelta
@@ -23,29 +29,62 @@ class CinemaApp:
         self.root.geometry("1200x800")
         
         self.cinema = Cinema("CHENG Movie Theater")
-        self.data_storage = DataStorage("cinema_data.json")
+        self.data_storage = JournalStorage("cinema_data.json", fast_start=True)
         
         self.reservation_manager = ReservationManager(self.cinema)
         self.admin_manager = AdminManager(self.cinema)
+        self.hold_manager = HoldManager(self.cinema, self.reservation_manager)
+        self.current_hold = None # seats held while the booking form is open
+        self.screening_id_map = {} # screening combo option -> screening id
         self.load_data()
+
+        # changes are saved in the background, see save_changes
+        self.data_writer = BackgroundWriter(self.cinema, self.data_storage, interval=1.0)
+        self.data_writer.start()
         
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.create_widgets()
         self.show_main_menu()
+        self.expire_holds()
     
     def load_data(self):
-        loaded_cinema = self.data_storage.load_data()
+        try:
+            loaded_cinema = self.data_storage.load_data()
+        except DataStorageError as e:
+            # starting with demo data would overwrite the file on the first save
+            messagebox.showerror("Error", f"{e}\nThe data file was left unchanged.")
+            raise SystemExit(1)
         if loaded_cinema:
             self.cinema = loaded_cinema
+            self.reservation_manager.cinema = self.cinema
+            self.admin_manager.cinema = self.cinema
+            self.hold_manager.cinema = self.cinema
             # Update next IDs
-            if self.cinema.movies:
-                self.admin_manager.next_movie_id = max(m.id for m in self.cinema.movies) + 1
-            if self.cinema.screenings:
-                self.admin_manager.next_screening_id = max(s.id for s in self.cinema.screenings) + 1
-            if self.cinema.reservations:
-                self.reservation_manager.next_reservation_id = max(r.id for r in self.cinema.reservations) + 1
+            self.admin_manager.next_movie_id = self.cinema.get_newest_movie_id() + 1
+            self.admin_manager.next_screening_id = self.cinema.get_newest_screening_id() + 1
+            # does not force the deferred reservations to load
+            self.reservation_manager.next_reservation_id = self.cinema.get_newest_reservation_id() + 1
     
     def save_data(self):
-        self.data_storage.save_data(self.cinema)
+        self.data_writer.save_all()
+
+    def save_changes(self):
+        self.data_writer.notify()
+
+    def expire_holds(self):
+        self.hold_manager.expire_holds()
+        self.root.after(1000, self.expire_holds)
+
+    def release_current_hold(self):
+        if self.current_hold:
+            self.hold_manager.release_hold(self.current_hold.id)
+            self.current_hold = None
+
+    def on_close(self):
+        self.data_writer.close()
+        if metrics.enabled:
+            metrics.write("cinema_metrics.json")
+        self.root.destroy()
     
     def create_widgets(self):
         # Create main frame
@@ -71,6 +110,7 @@ class CinemaApp:
         for widget in self.content_frame.winfo_children():
             widget.destroy()
     
+    @timed
     def show_main_menu(self):
         self.clear_content()
         
@@ -101,10 +141,11 @@ class CinemaApp:
                 book_btn = tk.Button(movie_frame, text="Reserve", command=lambda m=movie: self.show_screenings(m.id))
                 book_btn.pack(side=tk.RIGHT, padx=10)
     
+    @timed
     def show_screenings(self, movie_id):
         self.clear_content()
         
-        movie = next((m for m in self.cinema.movies if m.id == movie_id), None)
+        movie = self.cinema.get_movie_by_id(movie_id)
         if not movie:
             messagebox.showerror("Error", "Movie not exists")
             self.show_main_menu()
@@ -120,7 +161,7 @@ class CinemaApp:
             no_screenings_label.pack(pady=20)
         else:
             for screening in screenings:
-                room = next((r for r in self.cinema.screening_rooms if r.id == screening.room_id), None)
+                room = self.cinema.get_screening_room_by_id(screening.room_id)
                 if not room:
                     continue
                 
@@ -136,18 +177,21 @@ class CinemaApp:
                 price_label = tk.Label(screening_frame, text=f"Ticket price: ¥{screening.price}", font=("Arial", 12))
                 price_label.pack(anchor=tk.W)
                 
-                available_seats = screening.get_available_seats(room)
-                seat_count_label = tk.Label(screening_frame, text=f"Seats available: {len(available_seats)}/{room.get_total_seats()}", font=("Arial", 12))
+                availability = self.cinema.get_screening_availability(screening.id)
+                seat_text = "Sold out" if availability.sold_out else f"Seats available: {availability.free}/{availability.capacity}"
+                seat_count_label = tk.Label(screening_frame, text=seat_text, font=("Arial", 12))
                 seat_count_label.pack(anchor=tk.W)
                 
                 book_btn = tk.Button(screening_frame, text="Select Seats", command=lambda s=screening, r=room: self.show_seat_selection(s.id, r.id))
                 book_btn.pack(side=tk.RIGHT, padx=10)
     
+    @timed
     def show_seat_selection(self, screening_id, room_id):
+        self.release_current_hold()
         self.clear_content()
         
         screening = self.cinema.get_screening_by_id(screening_id)
-        room = next((r for r in self.cinema.screening_rooms if r.id == room_id), None)
+        room = self.cinema.get_screening_room_by_id(room_id)
         
         if not screening or not room:
             messagebox.showerror("Error", "Screening or room doesn't exist")
@@ -163,32 +207,13 @@ class CinemaApp:
         screen_label = tk.Label(screen_frame, text="Screen", font=("Arial", 14, "bold"), bg="lightgray")
         screen_label.pack(pady=5)
         
-        # Create seat selection area
-        seats_frame = tk.Frame(self.content_frame)
-        seats_frame.pack(pady=20)
+        # Create seat selection area, one canvas for all seats
+        self.seat_canvas = SeatMapCanvas(self.content_frame, room.rows, room.cols, on_toggle=self.toggle_seat)
+        self.seat_canvas.pack(pady=20)
+        self.seat_canvas.set_available(screening.get_available_seats(room))
         
         # Store selected seats
-        self.selected_seats = []
-        self.seat_buttons = {}
-        
-        available_seats = screening.get_available_seats(room)
-        
-        for row in range(1, room.rows + 1):
-            row_frame = tk.Frame(seats_frame)
-            row_frame.pack()
-            
-            for col in range(1, room.cols + 1):
-                seat = (row, col)
-                if seat in available_seats:
-                    btn = tk.Button(row_frame, text=f"{row}-{col}", width=3, height=1,
-                                   bg="green", fg="white",
-                                   command=lambda s=seat: self.toggle_seat(s))
-                else:
-                    btn = tk.Button(row_frame, text=f"{row}-{col}", width=3, height=1,
-                                   bg="red", fg="white", state=tk.DISABLED)
-                
-                btn.grid(row=row, column=col, padx=2, pady=2)
-                self.seat_buttons[seat] = btn
+        self.selected_seats = self.seat_canvas.selected
         
         # Display selected seats
         selected_frame = tk.LabelFrame(self.content_frame, text="Selected Seats")
@@ -197,6 +222,15 @@ class CinemaApp:
         self.selected_seats_label = tk.Label(selected_frame, text="No seats selected")
         self.selected_seats_label.pack(anchor=tk.W, padx=10)
         
+        # let the system pick adjacent seats near the centre
+        best_frame = tk.Frame(self.content_frame)
+        best_frame.pack(pady=5)
+        tk.Label(best_frame, text="Number of seats:").pack(side=tk.LEFT)
+        best_count_var = tk.StringVar(value="2")
+        tk.Spinbox(best_frame, from_=1, to=room.cols, textvariable=best_count_var, width=5).pack(side=tk.LEFT, padx=5)
+        best_btn = tk.Button(best_frame, text="Best Available", command=lambda: self.select_best_seats(screening, best_count_var.get()))
+        best_btn.pack(side=tk.LEFT, padx=5)
+        
         # Create booking button
         book_frame = tk.Frame(self.content_frame)
         book_frame.pack(pady=20)
@@ -204,29 +238,56 @@ class CinemaApp:
         book_btn = tk.Button(book_frame, text="Confirm Selection", command=lambda: self.show_booking_form(screening_id, room_id),
                            bg="blue", fg="white", padx=20, pady=10)
         book_btn.pack()
+        
+        self.root.after(2000, lambda: self.refresh_seat_map(self.seat_canvas, screening, room))
     
-    def toggle_seat(self, seat):
-        if seat in self.selected_seats:
-            self.selected_seats.remove(seat)
-            self.seat_buttons[seat].config(bg="green")
-        else:
-            self.selected_seats.append(seat)
-            self.seat_buttons[seat].config(bg="yellow", fg="black")
+    # show seats booked by others while the customer is choosing
+    def refresh_seat_map(self, seat_canvas, screening, room):
+        if not seat_canvas.winfo_exists():
+            return
+        seat_canvas.set_available(screening.get_available_seats(room))
+        self.root.after(2000, lambda: self.refresh_seat_map(seat_canvas, screening, room))
+    
+    def select_best_seats(self, screening, count_str):
+        try:
+            count = int(count_str)
+        except ValueError:
+            messagebox.showerror("Error", "Please enter a number of seats")
+            return
+        
+        seats = screening.find_best_seats(count)
+        if not seats:
+            messagebox.showerror("Error", f"No {count} adjacent seats are available")
+            return
         
+        self.seat_canvas.set_selected(seats)
+    
+    # called by the seat canvas, which keeps self.selected_seats
+    def toggle_seat(self, seat, selected):
         if self.selected_seats:
             self.selected_seats_label.config(text=", ".join([f"{s[0]}-{s[1]}" for s in self.selected_seats]))
         else:
             self.selected_seats_label.config(text="No seats selected")
     
+    @timed
     def show_booking_form(self, screening_id, room_id):
         if not self.selected_seats:
             messagebox.showerror("Error", "Please select seats")
             return
+
+        # keep the seats for this customer while the form is filled in
+        self.release_current_hold()
+        success, result = self.hold_manager.place_hold(screening_id, self.selected_seats)
+        if not success:
+            messagebox.showerror("Error", result)
+            self.show_seat_selection(screening_id, room_id)
+            return
+        self.current_hold = result
         
         self.clear_content()
         
         screening = self.cinema.get_screening_by_id(screening_id)
-        room = next((r for r in self.cinema.screening_rooms if r.id == room_id), None)
+        room = self.cinema.get_screening_room_by_id(room_id)
         
         if not screening or not room:
             messagebox.showerror("Error", "Screening or room not found")
@@ -240,7 +301,7 @@ class CinemaApp:
         summary_frame = tk.LabelFrame(self.content_frame, text="Booking Summary")
         summary_frame.pack(fill=tk.X, pady=10)
         
-        movie = next((m for m in self.cinema.movies if m.id == screening.movie_id), None)
+        movie = self.cinema.get_movie_by_id(screening.movie_id)
         movie_title = movie.title if movie else "Unknown Movie"
         
         tk.Label(summary_frame, text=f"Movie: {movie_title}", font=("Arial", 12)).pack(anchor=tk.W, padx=10)
@@ -267,21 +328,27 @@ class CinemaApp:
                              bg="blue", fg="white", padx=20, pady=10)
         submit_btn.pack(pady=20)
     
+    @timed
     def process_booking(self, screening_id, name, email):
         if not name or not email:
             messagebox.showerror("Error", "Please enter name and email")
             return
         
-        success, result = self.reservation_manager.make_reservation(
-            screening_id, name, email, self.selected_seats
-        )
+        hold_id = self.current_hold.id if self.current_hold else None
+        success, result = self.hold_manager.confirm_hold(hold_id, name, email)
+        self.current_hold = None
         
         if success:
-            self.save_data()
+            self.save_changes()
             self.show_booking_confirmation(result)
         else:
             messagebox.showerror("Error", result)
+            # the seats are no longer held, let the customer pick again
+            screening = self.cinema.get_screening_by_id(screening_id)
+            if screening:
+                self.show_seat_selection(screening_id, screening.room_id)
     
+    @timed
     def show_booking_confirmation(self, reservation):
         self.clear_content()
         
@@ -289,7 +356,7 @@ class CinemaApp:
         title.pack(pady=20)
         
         screening = self.cinema.get_screening_by_id(reservation.screening_id)
-        movie = next((m for m in self.cinema.movies if m.id == screening.movie_id), None)
+        movie = self.cinema.get_movie_by_id(screening.movie_id)
         movie_title = movie.title if movie else "Unknown Movie"
         
         confirmation_frame = tk.Frame(self.content_frame)
@@ -307,6 +374,7 @@ class CinemaApp:
                            bg="blue", fg="white", padx=20, pady=10)
         home_btn.pack(pady=20)
     
+    @timed
     def show_admin_login(self):
         self.clear_content()
         
@@ -336,6 +404,7 @@ class CinemaApp:
         else:
             messagebox.showerror("Login Failed", "Invalid username or password")
     
+    @timed
     def show_admin_menu(self):
         self.clear_content()
         
@@ -353,6 +422,10 @@ class CinemaApp:
                                      width=20, height=2, font=("Arial", 12))
         add_screening_btn.pack(pady=10)
         
+        import_schedule_btn = tk.Button(btn_frame, text="Import Schedule", command=self.import_schedule,
+                                       width=20, height=2, font=("Arial", 12))
+        import_schedule_btn.pack(pady=10)
+        
         view_reservations_btn = tk.Button(btn_frame, text="View Reservations", command=self.show_view_reservations,
                                          width=20, height=2, font=("Arial", 12))
         view_reservations_btn.pack(pady=10)
@@ -361,6 +434,7 @@ class CinemaApp:
                              width=20, height=2, font=("Arial", 12), fg="red")
         logout_btn.pack(pady=10)
     
+    @timed
     def show_add_movie_form(self):
         self.clear_content()
         
@@ -410,11 +484,12 @@ class CinemaApp:
             return
         
         movie = self.admin_manager.add_movie(title, duration, rating, description.strip())
-        self.save_data()
+        self.save_changes()
         
         messagebox.showinfo("Success", f"Movie '{movie.title}' added successfully")
         self.show_admin_menu()
     
+    @timed
     def show_add_screening_form(self):
         self.clear_content()
         
@@ -485,6 +560,7 @@ class CinemaApp:
                            bg="blue", fg="white", padx=20, pady=10)
         home_btn.pack(pady=20)
     
+    @timed
     def process_add_screening(self, movie_text, room_text, date_str, time_str, price_str, movie_id_map, room_id_map):
         if not movie_text or not room_text or not date_str or not time_str or not price_str:
             messagebox.showerror("Error", "Please fill in all required fields")
@@ -505,12 +581,36 @@ class CinemaApp:
             messagebox.showerror("Error", f"Invalid input: {str(e)}")
             return
         
-        screening = self.admin_manager.add_screening(movie_id, room_id, start_time, price)
-        self.save_data()
+        try:
+            screening = self.admin_manager.add_screening(movie_id, room_id, start_time, price)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self.save_changes()
         
         messagebox.showinfo("Success", f"Screening added successfully: {screening.start_time.strftime('%Y-%m-%d %H:%M')}")
         self.show_admin_menu()
     
+    # week schedule from a .csv or .json file, added and saved as one batch
+    def import_schedule(self):
+        filename = filedialog.askopenfilename(
+            title="Import Schedule",
+            filetypes=[("Schedule files", "*.csv *.json"), ("All files", "*.*")]
+        )
+        if not filename:
+            return
+        
+        try:
+            screenings = self.admin_manager.import_schedule(filename)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self.data_writer.flush()
+        
+        messagebox.showinfo("Success", f"{len(screenings)} screenings imported")
+        self.show_admin_menu()
+    
+    @timed
     def show_view_reservations(self):
         self.clear_content()
         
@@ -580,11 +680,14 @@ class CinemaApp:
         screening_id_map = {}
         
         for screening in screenings:
-            room = next((r for r in self.cinema.screening_rooms if r.id == screening.room_id), None)
+            room = self.cinema.get_screening_room_by_id(screening.room_id)
             room_name = room.name if room else "Unknown Room"
-            screening_options.append(f"{screening.start_time.strftime('%Y-%m-%d %H:%M')} | {room_name}")
-            screening_id_map[screening.start_time.strftime('%Y-%m-%d %H:%M')] = screening.id
+            option = f"{screening.start_time.strftime('%Y-%m-%d %H:%M')} | {room_name}"
+            screening_options.append(option)
+            screening_id_map[option] = screening.id
         
+        # display_reservations finds the selected screening here
+        self.screening_id_map = screening_id_map
         screening_combo['values'] = screening_options
         if screening_options:
             screening_combo.current(0)
@@ -597,19 +700,15 @@ class CinemaApp:
             self.show_view_reservations()
             return
         
-        # Parse screening time from the combo box selection
-        screening_time_str = screening_info.split(" | ")[0]
-        screenings = self.cinema.get_screenings_by_movie(movie_id)
-        
-        screening = next((s for s in screenings if s.start_time.strftime('%Y-%m-%d %H:%M') == screening_time_str), None)
+        screening = self.cinema.get_screening_by_id(self.screening_id_map.get(screening_info))
         
         if not screening:
             messagebox.showerror("Error", "Selected screening not found")
             self.show_view_reservations()
             return
         
-        movie = next((m for m in self.cinema.movies if m.id == screening.movie_id), None)
-        room = next((r for r in self.cinema.screening_rooms if r.id == screening.room_id), None)
+        movie = self.cinema.get_movie_by_id(screening.movie_id)
+        room = self.cinema.get_screening_room_by_id(screening.room_id)
         
         # Display screening information
         info_frame = tk.LabelFrame(self.content_frame, text="Screening Information")
@@ -649,6 +748,11 @@ class CinemaApp:
                 ))
             
             tree.pack(fill=tk.BOTH, expand=True)
+
+            cancel_btn = tk.Button(reservations_frame, text="Cancel Reservation",
+                                  command=lambda: self.process_cancel_reservation(tree, movie_id, screening_info),
+                                  bg="blue", fg="white", padx=20, pady=10)
+            cancel_btn.pack(pady=10)
         
         back_btn = tk.Button(self.content_frame, text="Back", command=self.show_view_reservations,
                            bg="blue", fg="white", padx=20, pady=10)
@@ -659,6 +763,27 @@ class CinemaApp:
         home_btn.pack(pady=20)
 
 
+    # cancel the reservation selected in the list, its seats can be booked again right away
+    @timed
+    def process_cancel_reservation(self, tree, movie_id, screening_info):
+        selected = tree.selection()
+        if not selected:
+            messagebox.showerror("Error", "Please select a reservation")
+            return
+        reservation_id = int(tree.item(selected[0], "values")[0])
+        if not messagebox.askyesno("Cancel Reservation", f"Cancel reservation {reservation_id}?"):
+            return
+        
+        success, result = self.reservation_manager.cancel_reservation(reservation_id)
+        if not success:
+            messagebox.showerror("Error", result)
+            return
+        self.save_changes()
+        
+        messagebox.showinfo("Success", f"Reservation {reservation_id} cancelled, refund: ¥{result}")
+        self.display_reservations(movie_id, screening_info)
+
+
 def initialize_demo_data(cinema):
     # Add screening rooms
     room1 = ScreeningRoom(1, "Room 1", 10, 15)
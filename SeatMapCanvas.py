@@ -0,0 +1,108 @@
+import tkinter as tk
+
+COLORS = {"free": "green", "taken": "red", "selected": "yellow"}
+
+'''
+Seat Map Canvas
+the seats of a screening drawn as rectangles on one canvas instead of one
+button per seat. Clicks are mapped to a seat from the coordinates, and
+set_available only recolours the seats whose state changed, so big halls
+draw quickly and can be refreshed while the screen is open.
+'''
+class SeatMapCanvas(tk.Frame):
+    # on_toggle(seat, selected) is called when the customer clicks a free or selected seat
+    def __init__(self, parent, rows, cols, on_toggle=None, max_width=1000, max_height=420):
+        super().__init__(parent)
+        self.rows = rows
+        self.cols = cols
+        self.on_toggle = on_toggle
+        # seats shrink for big halls, down to a size that can still be clicked
+        self.pitch = max(10, min(32, (max_width - 40) // max(cols, 1), (max_height - 10) // max(rows, 1)))
+        self.gap = 2 if self.pitch < 20 else 4
+        self.left = 30 # room for the row numbers
+        self.top = 4
+
+        width = self.left + cols * self.pitch
+        height = self.top + rows * self.pitch
+        self.canvas = tk.Canvas(self, width=min(width, max_width), height=min(height, max_height),
+                                scrollregion=(0, 0, width, height), highlightthickness=0)
+        if width > max_width:
+            x_scroll = tk.Scrollbar(self, orient=tk.HORIZONTAL, command=self.canvas.xview)
+            self.canvas.config(xscrollcommand=x_scroll.set)
+            x_scroll.pack(side=tk.BOTTOM, fill=tk.X)
+        if height > max_height:
+            y_scroll = tk.Scrollbar(self, orient=tk.VERTICAL, command=self.canvas.yview)
+            self.canvas.config(yscrollcommand=y_scroll.set)
+            y_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT)
+
+        self.items = {} # seat -> rectangle item
+        self.states = {} # seat -> "free", "taken" or "selected"
+        self.selected = []
+        self.draw()
+        self.canvas.bind("<Button-1>", self.on_click)
+
+    def draw(self):
+        font = ("Arial", max(7, min(10, self.pitch // 3)))
+        size = self.pitch - self.gap
+        for row in range(1, self.rows + 1):
+            y = self.top + (row - 1) * self.pitch
+            self.canvas.create_text(self.left - 6, y + size / 2, text=str(row), anchor=tk.E, font=font)
+            for col in range(1, self.cols + 1):
+                x = self.left + (col - 1) * self.pitch
+                seat = (row, col)
+                self.items[seat] = self.canvas.create_rectangle(x, y, x + size, y + size, fill=COLORS["taken"], outline="")
+                self.states[seat] = "taken"
+
+    # seat under the canvas position, None in the gaps and outside the room
+    def seat_at(self, x, y):
+        col, col_offset = divmod(int(x) - self.left, self.pitch)
+        row, row_offset = divmod(int(y) - self.top, self.pitch)
+        if not (0 <= row < self.rows and 0 <= col < self.cols):
+            return None
+        if col_offset >= self.pitch - self.gap or row_offset >= self.pitch - self.gap:
+            return None
+        return (row + 1, col + 1)
+
+    def on_click(self, event):
+        seat = self.seat_at(self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
+        if seat is None or self.states[seat] == "taken":
+            return
+        self.toggle(seat)
+
+    def toggle(self, seat):
+        selected = self.states[seat] != "selected"
+        if selected:
+            self.selected.append(seat)
+        else:
+            self.selected.remove(seat)
+        self._set_state(seat, "selected" if selected else "free")
+        if self.on_toggle:
+            self.on_toggle(seat, selected)
+
+    def _set_state(self, seat, state):
+        if self.states[seat] != state:
+            self.states[seat] = state
+            self.canvas.itemconfig(self.items[seat], fill=COLORS[state])
+
+    # available: the seats that can be booked; selected seats that were taken
+    # in the meantime are dropped from the selection
+    def set_available(self, available):
+        available = set(available)
+        for seat, state in self.states.items():
+            if seat in available:
+                if state == "taken":
+                    self._set_state(seat, "free")
+            elif state != "taken":
+                if state == "selected":
+                    self.selected.remove(seat)
+                    if self.on_toggle:
+                        self.on_toggle(seat, False)
+                self._set_state(seat, "taken")
+
+    def set_selected(self, seats):
+        for seat in list(self.selected):
+            self.toggle(seat)
+        for seat in seats:
+            if self.states.get(seat) == "free":
+                self.toggle(seat)
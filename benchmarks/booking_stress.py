@@ -0,0 +1,134 @@
+from models.Cinema import Cinema
+from models.Movie import Movie
+from models.ScreeningRoom import ScreeningRoom
+from models.Screening import Screening
+from logics.ReservationManager import ReservationManager
+from logics.BookingEngine import BookingEngine
+from data_storage.DataStorage import DataStorage
+from data_storage.JournalStorage import JournalStorage
+from data_storage.SqliteStorage import SqliteStorage
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import os
+import random
+import sys
+import tempfile
+
+'''
+Stress check for BookingEngine
+many threads book random seats of a few screenings at the same time,
+afterwards no seat may be sold twice and the seat maps must match the
+reservations. With a storage every booking is also saved, and the cinema
+loaded back from disk must hold exactly the reservations booked in memory.
+
+python -m benchmarks.booking_stress [threads] [attempts] [storage]
+storage: memory, json, journal or sqlite, all of them when left out
+'''
+# storage name -> storage for a file in the given directory
+STORAGES = {
+    "memory": lambda directory: None,
+    "json": lambda directory: DataStorage(os.path.join(directory, "cinema.json")),
+    "journal": lambda directory: JournalStorage(os.path.join(directory, "cinema.json")),
+    "sqlite": lambda directory: SqliteStorage(os.path.join(directory, "cinema.db")),
+}
+
+def build_cinema(screening_count=8, rows=10, cols=12):
+    cinema = Cinema("Stress Cinema")
+    cinema.add_screening_room(ScreeningRoom(1, "Room 1", rows, cols))
+    cinema.add_movie(Movie(1, "Stress Movie", 120, "PG", ""))
+    start = datetime(2025, 1, 1, 10, 0)
+    for screening_id in range(1, screening_count + 1):
+        cinema.add_screening(Screening(screening_id, 1, 1, start + timedelta(hours=3 * screening_id), 10.0))
+    return cinema
+
+
+def random_request(rng, cinema):
+    screening = rng.choice(cinema.screenings)
+    room = cinema.get_screening_room_by_id(screening.room_id)
+    row = rng.randint(1, room.rows)
+    first_col = rng.randint(1, room.cols)
+    count = rng.randint(1, 4)
+    seats = [(row, col) for col in range(first_col, min(first_col + count, room.cols + 1))]
+    return screening.id, seats
+
+
+def check_invariants(cinema):
+    errors = []
+    sold = {}
+    for reservation in cinema.reservations:
+        for seat in reservation.seats:
+            key = (reservation.screening_id, seat)
+            if key in sold:
+                errors.append(f"Seat {seat} of screening {reservation.screening_id} sold to reservations {sold[key]} and {reservation.id}")
+            sold[key] = reservation.id
+
+    for screening in cinema.screenings:
+        booked = {seat for (screening_id, seat) in sold if screening_id == screening.id}
+        if booked != screening.reserved_seats:
+            errors.append(f"Seat map of screening {screening.id} does not match its reservations")
+
+    ids = [r.id for r in cinema.reservations]
+    if len(ids) != len(set(ids)):
+        errors.append("Duplicate reservation ids")
+    if ids and sorted(ids) != list(range(1, len(ids) + 1)):
+        errors.append("Reservation ids are not contiguous")
+    return errors
+
+
+# reservations as comparable tuples, the timestamps are stored to the second
+def reservation_rows(cinema):
+    return sorted((r.id, r.screening_id, r.customer_name, r.customer_email, tuple(r.seats)) for r in cinema.reservations)
+
+
+def check_persisted(cinema, loaded):
+    if not loaded:
+        return ["Nothing could be loaded back"]
+    errors = [f"Loaded back: {error}" for error in check_invariants(loaded)]
+    if reservation_rows(loaded) != reservation_rows(cinema):
+        errors.append("The reservations loaded back differ from the ones booked")
+    return errors
+
+
+def run(threads=16, attempts=20000, seed=1, storage="memory"):
+    cinema = build_cinema()
+    rng = random.Random(seed)
+    requests = [random_request(rng, cinema) for _ in range(attempts)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        data_storage = STORAGES[storage](directory)
+        if data_storage:
+            data_storage.save_data(cinema)
+        engine = BookingEngine(ReservationManager(cinema), data_storage)
+
+        def book(request):
+            screening_id, seats = request
+            try:
+                success, _ = engine.book(screening_id, "Stress", "stress@example.com", seats)
+                return success, None
+            except Exception as e:
+                return False, f"{type(e).__name__}: {e}"
+
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(book, requests))
+
+        failures = [error for _, error in results if error]
+        print(f"{storage}: {attempts} attempts on {threads} threads, {sum(success for success, _ in results)} succeeded, {len(failures)} raised")
+        errors = [f"Booking raised {error}" for error in sorted(set(failures))] + check_invariants(cinema)
+        if data_storage:
+            data_storage.close()
+            errors += check_persisted(cinema, STORAGES[storage](directory).load_data())
+    return errors
+
+
+if __name__ == "__main__":
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    attempts = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    storages = sys.argv[3:4] or list(STORAGES)
+    errors = []
+    for storage in storages:
+        errors += run(threads, attempts, storage=storage)
+    for error in errors:
+        print(error)
+    print("FAILED" if errors else "OK")
+    sys.exit(1 if errors else 0)
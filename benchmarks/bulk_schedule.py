@@ -0,0 +1,75 @@
+from models.Cinema import Cinema
+from models.ScreeningRoom import ScreeningRoom
+from logics.AdminManager import AdminManager
+from data_storage.JournalStorage import JournalStorage
+
+from datetime import date, timedelta
+import os
+import sys
+import tempfile
+import time
+
+'''
+Bulk schedule import: AdminManager.add_screenings with one index rebuild and
+one journal commit, against adding the same screenings one by one.
+
+python -m benchmarks.bulk_schedule [screenings]
+'''
+TIMES = ["10:00", "12:30", "15:00", "17:30", "20:00"]
+
+def build_admin(room_count=40):
+    cinema = Cinema("Bulk Cinema")
+    for room_id in range(1, room_count + 1):
+        cinema.add_screening_room(ScreeningRoom(room_id, f"Room {room_id}", 12, 20))
+    admin_manager = AdminManager(cinema)
+    admin_manager.add_movie("Bulk Movie", 110, "PG", "")
+    return admin_manager
+
+
+def build_entries(admin_manager, screening_count, room_count=40):
+    days = -(-screening_count // (room_count * len(TIMES)))
+    first_date = date(2025, 1, 1)
+    entries = []
+    for room_id in range(1, room_count + 1):
+        entries += admin_manager.generate_screenings(1, room_id, first_date, first_date + timedelta(days=days - 1), TIMES, 10.0)
+    return entries[:screening_count]
+
+
+def run(screening_count=100000):
+    admin_manager = build_admin()
+    entries = build_entries(admin_manager, screening_count)
+    one_by_one = build_admin()
+
+    # adding one by one saves after every screening, compare on a sample
+    sample = entries[:min(len(entries), 2000)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        storage = JournalStorage(os.path.join(directory, "bulk.json"))
+        storage.save_data(admin_manager.cinema)
+        admin_manager.cinema.track_changes = True
+        start = time.perf_counter()
+        admin_manager.add_screenings(entries)
+        insert_time = time.perf_counter() - start
+        start = time.perf_counter()
+        storage.save_changes(admin_manager.cinema, admin_manager.cinema.take_dirty())
+        save_time = time.perf_counter() - start
+        storage.close()
+
+        storage = JournalStorage(os.path.join(directory, "single.json"))
+        storage.save_data(one_by_one.cinema)
+        start = time.perf_counter()
+        for movie_id, room_id, start_time, price in sample:
+            screening = one_by_one.add_screening(movie_id, room_id, start_time, price)
+            storage.save_screening(one_by_one.cinema, screening)
+        single_time = time.perf_counter() - start
+        storage.close()
+
+    assert len(admin_manager.cinema.screenings) == len(entries)
+    print(f"{len(entries)} screenings in {len(admin_manager.cinema.screening_rooms)} rooms")
+    print(f"add_screenings            {insert_time * 1000:9.1f} ms")
+    print(f"save as one commit        {save_time * 1000:9.1f} ms")
+    print(f"one by one, saving each   {single_time * 1000:9.1f} ms  for the first {len(sample)}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,185 @@
+from models.Cinema import Cinema
+from models.Movie import Movie
+from models.ScreeningRoom import ScreeningRoom
+from models.Screening import Screening
+from logics.ReservationManager import ReservationManager
+from data_storage.DataStorage import DataStorage
+
+from datetime import datetime, timedelta
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+
+'''
+Benchmarks for the booking and persistence hot paths on a synthetic cinema.
+Every operation is timed call by call, the results (throughput and latency
+percentiles) are written as JSON; --compare prints the change against the
+results of an earlier run.
+
+python -m benchmarks.hot_paths [--rooms 10] [--screenings 2000] [--reservations 50000]
+                               [--output benchmark_results.json] [--compare old.json]
+'''
+PERCENTILES = (50, 90, 99)
+
+def build_cinema(room_count, screening_count, reservation_count, seed=1):
+    rng = random.Random(seed)
+    cinema = Cinema("Benchmark Cinema")
+    for room_id in range(1, room_count + 1):
+        cinema.add_screening_room(ScreeningRoom(room_id, f"Room {room_id}", rng.randint(8, 20), rng.randint(10, 30)))
+    for movie_id in range(1, 31):
+        cinema.add_movie(Movie(movie_id, f"Movie {movie_id}", rng.randint(80, 180), "PG", ""))
+    start = datetime(2025, 1, 1, 10, 0)
+    for screening_id in range(1, screening_count + 1):
+        start_time = start + timedelta(days=screening_id // (room_count * 5), hours=2 * (screening_id % 5))
+        cinema.add_screening(Screening(screening_id, rng.randint(1, 30), 1 + screening_id % room_count, start_time, 10.0))
+
+    manager = ReservationManager(cinema)
+    for _ in range(reservation_count):
+        success, _ = manager.make_reservation(*random_request(rng, cinema))
+        if not success and cinema.get_newest_reservation_id() == 0:
+            break
+    cinema.clear_dirty()
+    return cinema
+
+
+def random_request(rng, cinema):
+    screening = cinema.get_screening_by_id(rng.randint(1, len(cinema.screenings)))
+    room = cinema.get_screening_room_by_id(screening.room_id)
+    row = rng.randint(1, room.rows)
+    col = rng.randint(1, room.cols - 1)
+    number = rng.randint(0, 4999)
+    return screening.id, f"Customer {number}", f"customer{number}@example.com", [(row, col), (row, col + 1)]
+
+
+# call function(*args) for every args, return the latency of every call in seconds
+def time_calls(function, calls):
+    latencies = []
+    for args in calls:
+        start = time.perf_counter()
+        function(*args)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def summarize(latencies):
+    ordered = sorted(latencies)
+    total = sum(ordered)
+    summary = {
+        "calls": len(ordered),
+        "ops_per_second": len(ordered) / total if total else None,
+        "mean_ms": total / len(ordered) * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+    for percentile in PERCENTILES:
+        position = min(len(ordered) - 1, int(len(ordered) * percentile / 100))
+        summary[f"p{percentile}_ms"] = ordered[position] * 1000
+    return summary
+
+
+def run(room_count, screening_count, reservation_count, calls=20000, file_rounds=5, seed=1):
+    rng = random.Random(seed + 1)
+    cinema = build_cinema(room_count, screening_count, reservation_count, seed)
+    results = {}
+
+    manager = ReservationManager(cinema)
+    results["ReservationManager.make_reservation"] = summarize(time_calls(
+        manager.make_reservation, [random_request(rng, cinema) for _ in range(calls)]))
+
+    results["Cinema.get_screening_by_id"] = summarize(time_calls(
+        cinema.get_screening_by_id, [(rng.randint(1, screening_count),) for _ in range(calls)]))
+
+    screenings = [cinema.get_screening_by_id(rng.randint(1, screening_count)) for _ in range(calls)]
+    results["Screening.get_available_seats"] = summarize(time_calls(
+        lambda screening: screening.get_available_seats(cinema.get_screening_room_by_id(screening.room_id)),
+        [(screening,) for screening in screenings]))
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "benchmark.json")
+        storage = DataStorage(filename)
+        results["DataStorage.save_data"] = summarize(time_calls(storage.save_data, [(cinema,)] * file_rounds))
+        results["DataStorage.load_data"] = summarize(time_calls(storage.load_data, [()] * file_rounds))
+        fast_storage = DataStorage(filename, fast_start=True)
+        results["DataStorage.load_data fast_start"] = summarize(time_calls(fast_storage.load_data, [()] * file_rounds))
+        file_size = os.path.getsize(filename)
+
+    return {
+        "commit": current_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "config": {
+            "rooms": room_count,
+            "screenings": screening_count,
+            "reservations": len(cinema.reservations),
+            "calls": calls,
+            "file_rounds": file_rounds,
+            "seed": seed,
+            "file_bytes": file_size,
+        },
+        "results": results,
+    }
+
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(report):
+    config = report["config"]
+    print(f"{config['rooms']} rooms, {config['screenings']} screenings, {config['reservations']} reservations, commit {report['commit']}")
+    print(f"{'operation':<36} {'ops/s':>12} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10}")
+    for name, summary in report["results"].items():
+        print(f"{name:<36} {summary['ops_per_second']:12.1f} {summary['p50_ms']:10.4f} {summary['p90_ms']:10.4f} {summary['p99_ms']:10.4f}")
+
+
+# p50 latency of every operation against an earlier run, slower by more than threshold is a regression
+def compare(report, baseline, threshold=0.10):
+    print(f"against commit {baseline.get('commit')} ({baseline.get('created')}):")
+    regressions = []
+    for name, summary in report["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if not old:
+            print(f"{name:<36} new")
+            continue
+        change = summary["p50_ms"] / old["p50_ms"] - 1 if old["p50_ms"] else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<36} p50 {old['p50_ms']:10.4f} -> {summary['p50_ms']:10.4f} ms  {change:+7.1%}{flag}")
+    if baseline.get("config") != report["config"]:
+        print("note: the runs used different settings")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the booking and persistence hot paths")
+    parser.add_argument("--rooms", type=int, default=10)
+    parser.add_argument("--screenings", type=int, default=2000)
+    parser.add_argument("--reservations", type=int, default=50000)
+    parser.add_argument("--calls", type=int, default=20000, help="calls per in-memory operation")
+    parser.add_argument("--file-rounds", type=int, default=5, help="saves and loads of the data file")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="results of an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.10, help="p50 slowdown reported as regression")
+    args = parser.parse_args()
+
+    report = run(args.rooms, args.screenings, args.reservations, args.calls, args.file_rounds, args.seed)
+    print_results(report)
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"results written to {args.output}")
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(report, json.load(file), args.threshold)
+        if regressions:
+            raise SystemExit(1)
@@ -0,0 +1,60 @@
+from models.Reservation import Reservation
+
+from datetime import datetime
+import gc
+import sys
+import time
+import tracemalloc
+
+'''
+Memory of reservations held in Cinema.reservations: the compact
+Reservation model against the dict backed layout it replaced.
+
+python -m benchmarks.reservation_memory [count]
+'''
+class LegacyReservation:
+
+    def __init__(self, id, screening_id, customer_name, customer_email, seats):
+        self.id = id
+        self.screening_id = screening_id
+        self.customer_name = customer_name
+        self.customer_email = customer_email
+        self.seats = seats
+        self.timestamp = datetime.now()
+
+
+def customer(i):
+    # customers come back, like in real data; the strings are built per record as a loader would
+    number = i % 5000
+    return f"Customer {number}", f"customer{number}@example.com"
+
+
+def measure(model, count):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    reservations = []
+    for i in range(count):
+        name, email = customer(i)
+        seats = [(1 + i % 20, 1 + i % 30), (1 + i % 20, 2 + i % 30)]
+        reservations.append(model(i, i % 10000, name, email, seats))
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del reservations
+    gc.collect()
+    return current, elapsed
+
+
+def run(count=1000000):
+    results = {}
+    for model in (LegacyReservation, Reservation):
+        memory, elapsed = measure(model, count)
+        results[model.__name__] = memory
+        print(f"{model.__name__:<18} {memory / 2**20:8.1f} MiB  {memory / count:6.1f} bytes/reservation  built in {elapsed:.2f}s")
+    print(f"Compact model uses {results['Reservation'] / results['LegacyReservation']:.0%} of the legacy memory")
+    return results
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
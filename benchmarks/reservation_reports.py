@@ -0,0 +1,82 @@
+from models.Cinema import Cinema
+from models.Movie import Movie
+from models.ScreeningRoom import ScreeningRoom
+from models.Screening import Screening
+from logics.ReservationManager import ReservationManager
+from logics.ReservationColumns import ReservationColumns, np
+
+from datetime import datetime, timedelta
+import random
+import sys
+import time
+
+'''
+Reporting over many reservations: ReservationColumns against a plain loop
+over the Reservation objects.
+
+python -m benchmarks.reservation_reports [reservations]
+'''
+def build_cinema(reservation_count, seed=1):
+    rng = random.Random(seed)
+    cinema = Cinema("Report Cinema")
+    for room_id in range(1, 9):
+        cinema.add_screening_room(ScreeningRoom(room_id, f"Room {room_id}", 20, 30))
+    for movie_id in range(1, 21):
+        cinema.add_movie(Movie(movie_id, f"Movie {movie_id}", 120, "PG", ""))
+    start = datetime(2024, 1, 1, 10, 0)
+    screening_count = max(1, reservation_count // 100)
+    for screening_id in range(1, screening_count + 1):
+        start_time = start + timedelta(days=screening_id // 40, hours=screening_id % 12)
+        cinema.add_screening(Screening(screening_id, rng.randint(1, 20), rng.randint(1, 8), start_time, rng.choice([8.0, 10.0, 12.5])))
+    manager = ReservationManager(cinema)
+    while len(cinema.reservations) < reservation_count:
+        screening = cinema.get_screening_by_id(rng.randint(1, screening_count))
+        row = rng.randint(1, 20)
+        col = rng.randint(1, 28)
+        manager.make_reservation(screening.id, "Report", "report@example.com", [(row, col), (row, col + 1)][:rng.randint(1, 2)])
+    return cinema
+
+
+def naive_reports(cinema):
+    daily, movies, heatmap, sold = {}, {}, [[0] * 24 for _ in range(7)], {}
+    for reservation in cinema.reservations:
+        screening = cinema.get_screening_by_id(reservation.screening_id)
+        price = reservation.get_total_price(screening)
+        day = screening.start_time.date()
+        daily[day] = daily.get(day, 0) + price
+        tickets, revenue = movies.get(screening.movie_id, (0, 0))
+        movies[screening.movie_id] = (tickets + len(reservation.seats), revenue + price)
+        heatmap[screening.start_time.weekday()][screening.start_time.hour] += len(reservation.seats)
+        sold[screening.room_id] = sold.get(screening.room_id, 0) + len(reservation.seats)
+    return daily, movies, heatmap, sold
+
+
+def columnar_reports(columns):
+    return columns.daily_revenue(), columns.sales_by_movie(), columns.hourly_heatmap(), columns.occupancy_by_room()
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def run(reservation_count=1000000):
+    cinema = build_cinema(reservation_count)
+    naive, naive_time = timed(naive_reports, cinema)
+    columns, build_time = timed(ReservationColumns.from_cinema, cinema)
+    columnar, columnar_time = timed(columnar_reports, columns)
+
+    assert sorted(naive[0]) == sorted(columnar[0])
+    assert all(abs(naive[0][day] - columnar[0][day]) < 1e-6 for day in naive[0])
+    assert naive[1] == columnar[1]
+    assert naive[2] == columnar[2]
+
+    print(f"{len(cinema.reservations)} reservations, numpy {'on' if np is not None else 'off'}")
+    print(f"naive loop over objects   {naive_time * 1000:9.1f} ms")
+    print(f"build columns             {build_time * 1000:9.1f} ms")
+    print(f"columnar reports          {columnar_time * 1000:9.1f} ms  ({naive_time / columnar_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,74 @@
+from models.Cinema import Cinema
+from models.Movie import Movie
+from models.ScreeningRoom import ScreeningRoom
+from models.Screening import Screening
+from data_storage.DataStorage import DataStorage
+from service.ShardRouter import ShardRouter
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import os
+import sys
+import tempfile
+import time
+
+'''
+Booking throughput of the sharded deployment: the same number of bookings
+sent to one theatre, and spread over several theatres booked in parallel,
+each theatre in its own worker process.
+
+python -m benchmarks.sharded_booking [theatres] [bookings per theatre]
+'''
+def write_theatre(filename, name, screening_count=20, rows=20, cols=30):
+    cinema = Cinema(name)
+    cinema.add_screening_room(ScreeningRoom(1, "Room 1", rows, cols))
+    cinema.add_movie(Movie(1, "Shard Movie", 120, "PG", ""))
+    start = datetime(2025, 1, 1, 10, 0)
+    for screening_id in range(1, screening_count + 1):
+        cinema.add_screening(Screening(screening_id, 1, 1, start + timedelta(hours=3 * screening_id), 10.0))
+    DataStorage(filename).save_data(cinema)
+
+
+# every booking takes the next free seat, cycling over the screenings
+def book(router, name, count, screening_count=20, cols=30):
+    for i in range(count):
+        screening_id = 1 + i % screening_count
+        seat_number = i // screening_count
+        router.make_reservation(name, screening_id, "Shard", "shard@example.com", [[1 + seat_number // cols, 1 + seat_number % cols]])
+
+
+# one theatre is booked alone, the others in parallel, so at least 2 are needed
+def run(theatre_count=4, bookings=500):
+    if theatre_count < 2:
+        raise ValueError(f"The benchmark needs at least 2 theatres, not {theatre_count}")
+    with tempfile.TemporaryDirectory() as directory:
+        names = [f"theatre{number}" for number in range(1, theatre_count + 1)]
+        for name in names:
+            write_theatre(os.path.join(directory, f"{name}.json"), name)
+        router = ShardRouter({name: os.path.join(directory, f"{name}.json") for name in names})
+        router.start()
+        try:
+            start = time.perf_counter()
+            book(router, names[0], bookings)
+            single_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=theatre_count) as executor:
+                for future in [executor.submit(book, router, name, bookings) for name in names[1:]]:
+                    future.result()
+            parallel_time = time.perf_counter() - start
+        finally:
+            router.close()
+
+    single_rate = bookings / single_time
+    parallel_rate = bookings * (theatre_count - 1) / parallel_time
+    print(f"{os.cpu_count()} cores")
+    print(f"1 theatre                 {single_rate:9.1f} bookings/s")
+    print(f"{theatre_count - 1} theatres in parallel   {parallel_rate:9.1f} bookings/s  ({parallel_rate / single_rate:.1f}x)")
+
+
+if __name__ == "__main__":
+    theatre_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    if theatre_count < 2:
+        sys.exit("Give at least 2 theatres: one is booked alone, the others in parallel")
+    run(theatre_count, int(sys.argv[2]) if len(sys.argv) > 2 else 500)
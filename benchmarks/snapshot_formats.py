@@ -0,0 +1,50 @@
+from benchmarks.hot_paths import build_cinema
+from data_storage.DataStorage import DataStorage
+
+import gc
+import os
+import sys
+import tempfile
+import time
+
+'''
+Size and speed of the snapshot formats: the same synthetic cinema saved and
+loaded as JSON and as a binary snapshot, with and without fast_start.
+
+python -m benchmarks.snapshot_formats [reservations]
+'''
+def timed_call(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def run(reservation_count=50000):
+    cinema = build_cinema(10, 2000, reservation_count)
+    reservation_count = len(cinema.reservations)
+    print(f"{len(cinema.screenings)} screenings, {reservation_count} reservations")
+    print(f"{'format':<8} {'size':>10} {'save':>9} {'load':>9} {'fast start':>11} {'first use':>10}")
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for snapshot_format in ("json", "binary"):
+            filename = os.path.join(directory, f"cinema.{snapshot_format}")
+            _, save_time = timed_call(DataStorage(filename, snapshot_format=snapshot_format).save_data, cinema)
+            loaded, load_time = timed_call(DataStorage(filename).load_data)
+            assert len(loaded.reservations) == reservation_count
+            fast, fast_time = timed_call(DataStorage(filename, fast_start=True).load_data)
+            _, first_use_time = timed_call(fast.load_deferred_reservations)
+            size = os.path.getsize(filename)
+            results[snapshot_format] = (size, save_time, load_time)
+            print(f"{snapshot_format:<8} {size / 2**20:8.2f}MiB {save_time:8.3f}s {load_time:8.3f}s {fast_time:10.3f}s {first_use_time:9.3f}s")
+            # the cinemas of one format must not slow down the collector for the next
+            del loaded, fast
+            gc.collect()
+
+    json_size, json_save, json_load = results["json"]
+    binary_size, binary_save, binary_load = results["binary"]
+    print(f"binary: {binary_size / json_size:.0%} of the size, saved {json_save / binary_save:.1f}x and loaded {json_load / binary_load:.1f}x as fast")
+    return results
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
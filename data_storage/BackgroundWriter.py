@@ -0,0 +1,88 @@
+import threading
+
+'''
+Background Writer
+collects the changes tracked by Cinema and hands them to a DataStorage in
+batches from a background thread, so saving never blocks the caller.
+
+durability:
+    "sync"    - notify() writes the changes before it returns
+    "batched" - changes are written every interval seconds or as soon as
+                batch_size changes are waiting, flush() forces a write
+'''
+class BackgroundWriter:
+    def __init__(self, cinema, data_storage, interval=1.0, batch_size=100, durability="batched"):
+        if durability not in ("sync", "batched"):
+            raise ValueError(f"Unknown durability setting {durability}")
+        self.cinema = cinema
+        cinema.track_changes = True # the cinema collects the changes this writer saves
+        self.data_storage = data_storage
+        self.interval = interval
+        self.batch_size = batch_size
+        self.durability = durability
+
+        self.condition = threading.Condition()
+        self.write_lock = threading.Lock() # one batch at a time, in order
+        self.running = False
+        self.thread = None
+        self.last_error = None
+
+    def start(self):
+        if self.durability == "sync" or self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="BackgroundWriter", daemon=True)
+        self.thread.start()
+
+    # call after changing the cinema
+    def notify(self):
+        if self.durability == "sync" or not self.running:
+            self.flush()
+        elif self.cinema.dirty_count() >= self.batch_size:
+            with self.condition:
+                self.condition.notify()
+
+    def run(self):
+        while self.running:
+            with self.condition:
+                self.condition.wait(self.interval)
+            try:
+                self.write_changes()
+            except Exception as e:
+                # keep the thread alive, the failed batch is retried next time
+                self.last_error = e
+                print(f"Error saving data: {e}")
+
+    def write_changes(self):
+        with self.write_lock:
+            changes = self.cinema.take_dirty()
+            if not any(changes.values()):
+                return
+            try:
+                self.data_storage.save_changes(self.cinema, changes)
+            except Exception:
+                # put the batch back so the next write retries it
+                for kind, records in changes.items():
+                    for record in records:
+                        self.cinema.mark_dirty(kind, record)
+                raise
+
+    # full rewrite of the cinema, pending changes are included in it
+    def save_all(self):
+        with self.write_lock:
+            self.cinema.clear_dirty()
+            self.data_storage.save_data(self.cinema)
+
+    # write everything that is waiting and make it durable
+    def flush(self):
+        self.write_changes()
+        self.data_storage.flush()
+
+    def close(self):
+        if self.running:
+            self.running = False
+            with self.condition:
+                self.condition.notify()
+            self.thread.join()
+        self.flush()
+        self.data_storage.close()
@@ -0,0 +1,206 @@
+from models.Movie import Movie
+from models.ScreeningRoom import ScreeningRoom
+from models.Screening import Screening
+from models.Reservation import Reservation, EPOCH
+from models.Cinema import Cinema
+from models.SeatMap import SeatMap
+
+from array import array
+from datetime import timedelta
+import json
+import struct
+import sys
+import time
+
+# first bytes of every binary snapshot, the last byte is the format version
+MAGIC = b"CINEMA\x00\x01"
+BLOCK_SIZE = struct.Struct("<Q")
+# string table number of a missing text (None), e.g. a movie without a rating
+NO_STRING = 0xFFFFFFFF
+
+'''
+Binary Snapshot
+compact alternative to the JSON snapshot of DataStorage. The file is MAGIC
+followed by length prefixed blocks:
+    meta          JSON text: cinema name and DataStorage.snapshot_meta
+    strings       offsets into the text, then the UTF-8 text of every
+                  distinct title, rating, name and email
+    movies        id, duration, title, rating, description
+    rooms         id, rows, cols, name
+    screenings    id, movie id, room id, start, price, seat map sizes,
+                  then all seat maps one after another
+    reservations  id, screening id, name, email, timestamp, seat counts,
+                  then the packed seats of all reservations
+Every table is stored column by column, each column an array written with
+tobytes and read back with frombytes (little endian); strings are numbers
+into the string table or NO_STRING for None, times are seconds since EPOCH.
+'''
+def column(typecode, values):
+    values = array(typecode, values)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+# the blocks of the snapshot, built apart from writing them so the caller
+# can hold the cinema lock for the first step only
+def binary_snapshot_blocks(cinema, meta):
+    strings = {}
+    def string(text):
+        if text is None:
+            return NO_STRING
+        if not isinstance(text, str):
+            raise ValueError(f"Binary snapshots store text, not {type(text).__name__} {text!r}")
+        return strings.setdefault(text, len(strings))
+
+    movies = cinema.movies
+    rooms = cinema.screening_rooms
+    screenings = cinema.screenings
+    seat_maps = [s.seat_map.to_bytes() if s.seat_map else b"" for s in screenings]
+    reservations = cinema.reservations
+    tables = [
+        column("q", [m.id for m in movies]),
+        column("q", [m.duration for m in movies]),
+        column("I", [string(m.title) for m in movies]),
+        column("I", [string(m.rating) for m in movies]),
+        column("I", [string(m.description) for m in movies]),
+
+        column("q", [r.id for r in rooms]),
+        column("q", [r.rows for r in rooms]),
+        column("q", [r.cols for r in rooms]),
+        column("I", [string(r.name) for r in rooms]),
+
+        column("q", [s.id for s in screenings]),
+        column("q", [s.movie_id for s in screenings]),
+        column("q", [s.room_id for s in screenings]),
+        column("q", [int((s.start_time - EPOCH).total_seconds()) for s in screenings]),
+        column("d", [s.price for s in screenings]),
+        column("I", [len(seat_map) for seat_map in seat_maps]),
+        b"".join(seat_maps),
+
+        column("q", [r.id for r in reservations]),
+        column("q", [r.screening_id for r in reservations]),
+        column("I", [string(r.customer_name) for r in reservations]),
+        column("I", [string(r.customer_email) for r in reservations]),
+        column("q", [r.epoch_seconds for r in reservations]),
+        column("I", [r.seat_count() for r in reservations]),
+        # Reservation keeps its seats packed little endian already
+        b"".join([r.packed_seats for r in reservations]),
+    ]
+
+    encoded = [text.encode("utf-8") for text in strings]
+    offsets = [0]
+    for text in encoded:
+        offsets.append(offsets[-1] + len(text))
+    return [json.dumps({"name": cinema.name, "meta": meta}).encode("utf-8"), column("Q", offsets), b"".join(encoded)] + tables
+
+
+def write_binary_snapshot(file, blocks):
+    file.write(MAGIC)
+    for block in blocks:
+        file.write(BLOCK_SIZE.pack(len(block)))
+        file.write(block)
+
+
+class BlockReader:
+    def __init__(self, data):
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError("Not a binary cinema snapshot")
+        self.data = memoryview(data)
+        self.pos = len(MAGIC)
+
+    def block(self):
+        (size,) = BLOCK_SIZE.unpack_from(self.data, self.pos)
+        start = self.pos + BLOCK_SIZE.size
+        self.pos = start + size
+        if self.pos > len(self.data):
+            raise ValueError("Binary cinema snapshot is truncated")
+        return self.data[start:self.pos]
+
+    def column(self, typecode):
+        values = array(typecode)
+        values.frombytes(self.block())
+        if sys.byteorder == "big":
+            values.byteswap()
+        return values
+
+
+# return (cinema, meta); with defer_reservations the reservations are only
+# built when Cinema first needs them, like DataStorage's fast_start
+def read_binary_snapshot(data, defer_reservations=False, timings=None):
+    timings = {} if timings is None else timings
+    reader = BlockReader(data)
+    header = json.loads(bytes(reader.block()))
+    meta = header.get("meta", {})
+    offsets = reader.column("Q")
+    text = bytes(reader.block())
+    strings = [sys.intern(text[start:end].decode("utf-8")) for start, end in zip(offsets, offsets[1:])]
+    def optional_string(index):
+        return None if index == NO_STRING else strings[index]
+    cinema = Cinema(header["name"])
+
+    start = time.perf_counter()
+    ids, durations, titles, ratings, descriptions = [reader.column(t) for t in "qqIII"]
+    for movie_id, title, duration, rating, description in zip(ids, titles, durations, ratings, descriptions):
+        cinema.add_movie(Movie(movie_id, optional_string(title), duration, optional_string(rating), optional_string(description)))
+    timings["movies"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ids, rows, cols, names = [reader.column(t) for t in "qqqI"]
+    for room_id, name, room_rows, room_cols in zip(ids, names, rows, cols):
+        cinema.add_screening_room(ScreeningRoom(room_id, optional_string(name), room_rows, room_cols))
+    timings["screening_rooms"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ids, movie_ids, room_ids, starts, prices, sizes = [reader.column(t) for t in "qqqqdI"]
+    seat_maps = reader.block()
+    loaded = []
+    position = 0
+    for screening_id, movie_id, room_id, seconds, price, size in zip(ids, movie_ids, room_ids, starts, prices, sizes):
+        room = cinema.get_screening_room_by_id(room_id)
+        screening = Screening(screening_id, movie_id, room_id, EPOCH + timedelta(seconds=seconds), price, room)
+        if size and room:
+            screening.seat_map = SeatMap(room.rows, room.cols, seat_maps[position:position + size])
+        position += size
+        loaded.append(screening)
+    # the schedule and the room intervals are built once for all of them
+    cinema.add_screenings(loaded)
+    timings["screenings"] = time.perf_counter() - start
+
+    columns = [reader.column(t) for t in "qqIIqI"]
+    seats = reader.block()
+    def load_reservations():
+        start = time.perf_counter()
+        reservations = []
+        position = 0
+        for reservation_id, screening_id, name, email, seconds, seat_count in zip(*columns):
+            end = position + 4 * seat_count
+            reservations.append(Reservation.from_packed(
+                reservation_id, screening_id, strings[name], strings[email], bytes(seats[position:end]), seconds))
+            position = end
+        timings["reservations (deferred)" if defer_reservations else "reservations"] = time.perf_counter() - start
+        return reservations
+
+    if defer_reservations and "newest_reservation_id" in meta:
+        # the seats are already taken in the stored seat maps
+        cinema.defer_reservations(load_reservations, meta["newest_reservation_id"])
+    else:
+        for reservation in load_reservations():
+            cinema.add_reservation(reservation, reserve_seats=False)
+
+    # everything was just read from disk, nothing to write back
+    cinema.clear_dirty()
+    return cinema, meta
+
+
+if __name__ == "__main__":
+    # python -m data_storage.BinarySnapshot cinema_data.json cinema_data.bin
+    from data_storage.DataStorage import DataStorage
+    json_filename = sys.argv[1] if len(sys.argv) > 1 else "cinema_data.json"
+    binary_filename = sys.argv[2] if len(sys.argv) > 2 else "cinema_data.bin"
+    cinema = DataStorage(json_filename).load_data()
+    if cinema:
+        DataStorage(binary_filename, snapshot_format="binary").save_data(cinema)
+        print(f"Converted {json_filename} to {binary_filename}")
+    else:
+        print(f"Could not read {json_filename}")
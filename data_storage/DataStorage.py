@@ -3,81 +3,280 @@ from models.ScreeningRoom import ScreeningRoom
 from models.Screening import Screening
 from models.Reservation import Reservation
 from models.Cinema import Cinema
+from models.SeatMap import SeatMap
+from data_storage.JsonStreamReader import JsonStreamReader
+from data_storage.BinarySnapshot import MAGIC, binary_snapshot_blocks, write_binary_snapshot, read_binary_snapshot
+from instrumentation.Metrics import timed
 
+import base64
 import json
 import os
+import threading
+import time
 from datetime import datetime
 
+# "2024-05-01 18:30" and "2024-05-01 18:30:00", much faster than strptime
+def parse_time(text):
+    return datetime.fromisoformat(text)
+
+
+class DataStorageError(Exception):
+    pass
+
+
 class DataStorage:
-    def __init__(self, filename):
+    # fast_start: stream the file section by section and load the reservations
+    # only when they are first used
+    # snapshot_format "json" or "binary" (see BinarySnapshot) for the files
+    # written, load_data reads either
+    def __init__(self, filename, fast_start=False, snapshot_format="json"):
+        if snapshot_format not in ("json", "binary"):
+            raise ValueError(f"Unknown snapshot format {snapshot_format}")
         self.filename = filename
+        self.fast_start = fast_start
+        self.snapshot_format = snapshot_format
+        self.load_timings = {} # seconds spent per section during the last load
+        self.lock = threading.RLock() # one write at a time, they share the temporary file
     
+    @timed
     def save_data(self, cinema):
-        data = {
-            "name": cinema.name,
-            "movies": [{"id": m.id, "title": m.title, "duration": m.duration, "rating": m.rating, "description": m.description} for m in cinema.movies],
-            "screening_rooms": [{"id": r.id, "name": r.name, "rows": r.rows, "cols": r.cols} for r in cinema.screening_rooms],
-            "screenings": [{"id": s.id, "movie_id": s.movie_id, "room_id": s.room_id, "start_time": s.start_time.strftime("%Y-%m-%d %H:%M"), "price": s.price, "reserved_seats": list(s.reserved_seats)} for s in cinema.screenings],
-            "reservations": [{"id": r.id, "screening_id": r.screening_id, "customer_name": r.customer_name, "customer_email": r.customer_email, "seats": r.seats, "timestamp": r.timestamp.strftime("%Y-%m-%d %H:%M:%S")} for r in cinema.reservations]
-        }
-
-        with open(self.filename, 'w') as file:
-            json.dump(data, file, indent=4)
+        with self.lock:
+            self.write_cinema(cinema)
+
+    # a single change only needs the whole file rewritten in this storage,
+    # subclasses that can persist one record at a time override these
+    def save_movie(self, cinema, movie):
+        self.save_data(cinema)
+
+    def save_screening(self, cinema, screening):
+        self.save_data(cinema)
+
+    def save_reservation(self, cinema, reservation):
+        self.save_data(cinema)
+
+    # reservation: cancelled or partly cancelled, see ReservationManager.cancel_seats
+    def save_cancellation(self, cinema, reservation):
+        self.save_data(cinema)
+
+    # changes: the dict returned by Cinema.take_dirty
+    @timed
+    def save_changes(self, cinema, changes):
+        if any(changes.values()):
+            self.save_data(cinema)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    # snapshot of the whole cinema in the configured format; it is taken under
+    # the cinema lock, so seat maps and reservations are from the same moment,
+    # and written to disk after the lock is released
+    def write_cinema(self, cinema):
+        if self.snapshot_format == "binary":
+            with cinema.lock:
+                blocks = binary_snapshot_blocks(cinema, self.snapshot_meta(cinema))
+            self.replace_file('wb', lambda file: write_binary_snapshot(file, blocks))
+        else:
+            self.write_snapshot(self.cinema_to_dict(cinema))
+
+    def write_snapshot(self, data):
+        self.replace_file('w', lambda file: json.dump(data, file, indent=4))
+
+    # write to a temporary file first so a crash never leaves a truncated file behind
+    def replace_file(self, mode, write):
+        temp_filename = self.filename + ".tmp"
+        with open(temp_filename, mode) as file:
+            write(file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_filename, self.filename)
+
+    def cinema_to_dict(self, cinema):
+        # reservations stay the last section, fast_start relies on it
+        with cinema.lock:
+            return {
+                "name": cinema.name,
+                "meta": self.snapshot_meta(cinema),
+                "movies": [self.movie_to_dict(m) for m in cinema.movies],
+                "screening_rooms": [self.room_to_dict(r) for r in cinema.screening_rooms],
+                "screenings": [self.screening_to_dict(s) for s in cinema.screenings],
+                "reservations": [self.reservation_to_dict(r) for r in cinema.reservations]
+            }
+
+    # small section at the top of the file, read before the big ones
+    def snapshot_meta(self, cinema):
+        return {"newest_reservation_id": cinema.get_newest_reservation_id()}
+
+    def movie_to_dict(self, m):
+        return {"id": m.id, "title": m.title, "duration": m.duration, "rating": m.rating, "description": m.description}
+
+    def room_to_dict(self, r):
+        return {"id": r.id, "name": r.name, "rows": r.rows, "cols": r.cols}
+
+    def screening_to_dict(self, s):
+        return {"id": s.id, "movie_id": s.movie_id, "room_id": s.room_id, "start_time": s.start_time.strftime("%Y-%m-%d %H:%M"), "price": s.price, "seat_map": self.seat_map_to_text(s.seat_map)}
+
+    def reservation_to_dict(self, r):
+        return {"id": r.id, "screening_id": r.screening_id, "customer_name": r.customer_name, "customer_email": r.customer_email, "seats": r.seats, "timestamp": r.timestamp.strftime("%Y-%m-%d %H:%M:%S")}
+
+    def movie_from_dict(self, movie_data):
+        return Movie(
+            movie_data["id"],
+            movie_data["title"],
+            movie_data["duration"],
+            movie_data["rating"],
+            movie_data["description"]
+        )
+
+    def room_from_dict(self, room_data):
+        return ScreeningRoom(
+            room_data["id"],
+            room_data["name"],
+            room_data["rows"],
+            room_data["cols"]
+        )
+
+    # seat maps are stored as base64 text of the seat bitmap
+    def seat_map_to_text(self, seat_map):
+        if not seat_map:
+            return None
+        return base64.b64encode(seat_map.to_bytes()).decode("ascii")
+
+    def screening_from_dict(self, screening_data, room):
+        screening = Screening(
+            screening_data["id"],
+            screening_data["movie_id"],
+            screening_data["room_id"],
+            parse_time(screening_data["start_time"]),
+            screening_data["price"],
+            room
+        )
+        seat_map = screening_data.get("seat_map")
+        if seat_map and room:
+            if isinstance(seat_map, str):
+                seat_map = base64.b64decode(seat_map)
+            screening.seat_map = SeatMap(room.rows, room.cols, seat_map)
+        elif "reserved_seats" in screening_data and room:
+            # files written before seat maps keep a list of [row, col] pairs
+            screening.reserved_seats = set(tuple(seat) for seat in screening_data["reserved_seats"])
+        return screening
+
+    def reservation_from_dict(self, reservation_data):
+        reservation = Reservation(
+            reservation_data["id"],
+            reservation_data["screening_id"],
+            reservation_data["customer_name"],
+            reservation_data["customer_email"],
+            [tuple(seat) for seat in reservation_data["seats"]]
+        )
+        reservation.timestamp = parse_time(reservation_data["timestamp"])
+        return reservation
+
+    def read_snapshot(self):
+        with open(self.filename, 'r') as file:
+            return json.load(file)
+
+    def cinema_from_dict(self, data):
+        cinema = Cinema(data["name"])
+        for key in ("movies", "screening_rooms", "screenings", "reservations"):
+            start = time.perf_counter()
+            for record_data in data.get(key, []):
+                self.add_record(cinema, key, record_data)
+            self.load_timings[key] = time.perf_counter() - start
+
+        # everything was just read from disk, nothing to write back
+        cinema.clear_dirty()
+        return cinema
+
+    def add_record(self, cinema, section, record_data):
+        if section == "movies":
+            cinema.add_movie(self.movie_from_dict(record_data))
+        elif section == "screening_rooms":
+            cinema.add_screening_room(self.room_from_dict(record_data))
+        elif section == "screenings":
+            room = cinema.get_screening_room_by_id(record_data["room_id"])
+            cinema.add_screening(self.screening_from_dict(record_data, room))
+        elif section == "reservations":
+            # the seats are already taken in the stored seat maps
+            cinema.add_reservation(self.reservation_from_dict(record_data), reserve_seats=False)
+
+    # return (cinema, meta) read from the file
+    def read_cinema(self):
+        self.load_timings = {}
+        if self.is_binary_snapshot():
+            cinema, meta = self.read_binary_cinema()
+        elif self.fast_start:
+            cinema, meta = self.stream_cinema()
+        else:
+            start = time.perf_counter()
+            data = self.read_snapshot()
+            self.load_timings["parse"] = time.perf_counter() - start
+            cinema = self.cinema_from_dict(data)
+            meta = dict(data.get("meta", {}))
+            # files written before the meta section kept the journal position at the top level
+            if "journal_seq" in data:
+                meta.setdefault("journal_seq", data["journal_seq"])
+        # the newest id can belong to a reservation that was cancelled since
+        cinema.note_reservation_id(meta.get("newest_reservation_id", 0))
+        return cinema, meta
+
+    def is_binary_snapshot(self):
+        with open(self.filename, 'rb') as file:
+            return file.read(len(MAGIC)) == MAGIC
+
+    # the whole file is read in one go, the tables are decoded column by column
+    def read_binary_cinema(self):
+        start = time.perf_counter()
+        with open(self.filename, 'rb') as file:
+            data = file.read()
+        self.load_timings["read"] = time.perf_counter() - start
+        return read_binary_snapshot(data, self.fast_start, self.load_timings)
+
+    def stream_cinema(self):
+        cinema = Cinema("")
+        meta = {}
+        with open(self.filename, 'r') as file:
+            reader = JsonStreamReader(file)
+            for key in reader.iter_keys():
+                start = time.perf_counter()
+                if key == "name":
+                    cinema.name = reader.read_value()
+                elif key == "meta":
+                    meta.update(reader.read_value())
+                elif key == "reservations" and "newest_reservation_id" in meta:
+                    # last section of the file, parsed on first use
+                    text = reader.read_remaining()
+                    cinema.defer_reservations(lambda: self.reservations_from_text(text), meta["newest_reservation_id"])
+                    self.load_timings[key] = time.perf_counter() - start
+                    break
+                elif key in ("movies", "screening_rooms", "screenings", "reservations"):
+                    for record_data in reader.iter_array():
+                        self.add_record(cinema, key, record_data)
+                else:
+                    meta.setdefault(key, reader.read_value())
+                self.load_timings[key] = time.perf_counter() - start
+
+        cinema.clear_dirty()
+        return cinema, meta
+
+    # text starts with the reservations array and runs to the end of the file
+    def reservations_from_text(self, text):
+        start = time.perf_counter()
+        records, _ = json.JSONDecoder().raw_decode(text.lstrip())
+        reservations = [self.reservation_from_dict(record_data) for record_data in records]
+        self.load_timings["reservations (deferred)"] = time.perf_counter() - start
+        return reservations
     
-    # return None if error, return cinema if data is True
+    # return None if there is no file yet, raise DataStorageError if it can't be read
+    @timed
     def load_data(self):
         if not os.path.exists(self.filename):
             return None
         try:
-            with open(self.filename, 'r') as file:
-                data = json.load(file)
-            cinema = Cinema(data["name"])
-             # Load movies
-            for movie_data in data.get("movies", []):
-                movie = Movie(
-                    movie_data["id"],
-                    movie_data["title"],
-                    movie_data["duration"],
-                    movie_data["rating"],
-                    movie_data["description"]
-                )
-                cinema.add_movie(movie)
-            
-            # Load screening rooms
-            for room_data in data.get("screening_rooms", []):
-                room = ScreeningRoom(
-                    room_data["id"],
-                    room_data["name"],
-                    room_data["rows"],
-                    room_data["cols"]
-                )
-                cinema.add_screening_room(room)
-            
-            # Load screenings
-            for screening_data in data.get("screenings", []):
-                screening = Screening(
-                    screening_data["id"],
-                    screening_data["movie_id"],
-                    screening_data["room_id"],
-                    datetime.strptime(screening_data["start_time"], "%Y-%m-%d %H:%M"),
-                    screening_data["price"]
-                )
-                screening.reserved_seats = set(tuple(seat) for seat in screening_data.get("reserved_seats", []))
-                cinema.add_screening(screening)
-            
-            # Load reservations
-            for reservation_data in data.get("reservations", []):
-                reservation = Reservation(
-                    reservation_data["id"],
-                    reservation_data["screening_id"],
-                    reservation_data["customer_name"],
-                    reservation_data["customer_email"],
-                    [tuple(seat) for seat in reservation_data["seats"]]
-                )
-                reservation.timestamp = datetime.strptime(reservation_data["timestamp"], "%Y-%m-%d %H:%M:%S")
-                cinema.add_reservation(reservation)
-            
+            cinema, _ = self.read_cinema()
             return cinema
         except Exception as e:
-            print(f"Error loading data: {e}")
-            return None
\ No newline at end of file
+            # the file is there but unreadable, it must not be mistaken for no data
+            raise DataStorageError(f"Error loading {self.filename}: {e}") from e
@@ -0,0 +1,242 @@
+from data_storage.DataStorage import DataStorage, DataStorageError
+from instrumentation.Metrics import timed
+
+import json
+import os
+import threading
+import time
+
+'''
+Journaled storage: the JSON or binary file written by DataStorage is used as a snapshot
+and every change after it is appended as one line to a journal file.
+load_data replays snapshot + journal, compaction folds the journal back
+into a new snapshot.
+'''
+class JournalStorage(DataStorage):
+    # sync_mode "commit": fsync after every record
+    # sync_mode "group": fsync at most once per group_commit_interval seconds
+    def __init__(self, filename, journal_filename=None, sync_mode="commit", group_commit_interval=0.05, compact_every=1000, fast_start=False, snapshot_format="json"):
+        super().__init__(filename, fast_start, snapshot_format)
+        self.journal_filename = journal_filename or filename + ".journal"
+        self.sync_mode = sync_mode
+        self.group_commit_interval = group_commit_interval
+        self.compact_every = compact_every
+
+        self.journal_file = None
+        self.journal_seq = 0 # sequence number of the last record written
+        self.records_since_snapshot = 0
+        self.last_sync = 0.0
+        self.sync_timer = None
+
+    @timed
+    def save_data(self, cinema):
+        # a full save is a compaction: new snapshot, empty journal
+        with self.lock:
+            self.write_cinema(cinema)
+            self._close_journal()
+            with open(self.journal_filename, 'w') as file:
+                os.fsync(file.fileno())
+            self.records_since_snapshot = 0
+
+    def snapshot_meta(self, cinema):
+        meta = super().snapshot_meta(cinema)
+        meta["journal_seq"] = self.journal_seq
+        return meta
+
+    def save_movie(self, cinema, movie):
+        self.append(cinema, [("movie", self.movie_to_dict(movie))])
+
+    def save_screening(self, cinema, screening):
+        self.append(cinema, [("screening", self.screening_to_dict(screening))])
+
+    def save_reservation(self, cinema, reservation):
+        self.append(cinema, [("reservation", self.reservation_to_dict(reservation))])
+
+    def save_cancellation(self, cinema, reservation):
+        self.append(cinema, [("cancellation", self.cancellation_to_dict(reservation))])
+
+    # all changes are appended as one commit. Cancellations go before the new
+    # reservations: a seat given back and sold again in the same batch must be
+    # free before it is taken on replay. A tombstone holds the seats that are
+    # left, so one for a reservation that is only added further down is a no-op
+    @timed
+    def save_changes(self, cinema, changes):
+        records = [("screening_room", self.room_to_dict(r)) for r in changes.get("screening_rooms", [])]
+        records += [("movie", self.movie_to_dict(m)) for m in changes.get("movies", [])]
+        records += [("screening", self.screening_to_dict(s)) for s in changes.get("screenings", [])]
+        records += [("cancellation", self.cancellation_to_dict(r)) for r in changes.get("cancellations", [])]
+        records += [("reservation", self.reservation_to_dict(r)) for r in changes.get("reservations", [])]
+        if records:
+            self.append(cinema, records)
+
+    # tombstone of a cancellation: the seats the reservation still has, none if it is gone
+    def cancellation_to_dict(self, r):
+        return {"id": r.id, "screening_id": r.screening_id, "seats": r.seats}
+
+    # records: list of (type, data), written and synced as one commit
+    @timed
+    def append(self, cinema, records):
+        with self.lock:
+            # without a snapshot there is nothing to replay the journal onto
+            if not os.path.exists(self.filename):
+                self.save_data(cinema)
+                return
+
+            lines = []
+            for kind, data in records:
+                self.journal_seq += 1
+                lines.append(json.dumps({"seq": self.journal_seq, "type": kind, "data": data}) + "\n")
+            journal = self._open_journal()
+            journal.write("".join(lines))
+            journal.flush()
+            self.records_since_snapshot += len(records)
+
+            if self.sync_mode == "commit":
+                os.fsync(journal.fileno())
+            else:
+                self._group_sync()
+
+            if self.records_since_snapshot >= self.compact_every:
+                self.compact()
+
+    # new snapshot made from the snapshot and the journal on disk. The cinema in
+    # memory can already hold changes whose records are still on their way to
+    # append; a snapshot of it would get those records applied a second time
+    def compact(self):
+        with self.lock:
+            cinema, meta = self.read_cinema()
+            self.replay_journal(cinema, meta.get("journal_seq", 0))
+            self.save_data(cinema)
+
+    # force everything written so far onto disk
+    def flush(self):
+        with self.lock:
+            if self.sync_timer:
+                self.sync_timer.cancel()
+                self.sync_timer = None
+            if self.journal_file:
+                self.journal_file.flush()
+                os.fsync(self.journal_file.fileno())
+                self.last_sync = time.monotonic()
+
+    def close(self):
+        with self.lock:
+            self.flush()
+            self._close_journal()
+
+    def _group_sync(self):
+        now = time.monotonic()
+        if now - self.last_sync >= self.group_commit_interval:
+            self.flush()
+        elif not self.sync_timer:
+            # make sure the tail of a burst reaches the disk too
+            self.sync_timer = threading.Timer(self.group_commit_interval, self.flush)
+            self.sync_timer.daemon = True
+            self.sync_timer.start()
+
+    def _open_journal(self):
+        if not self.journal_file:
+            self.journal_file = open(self.journal_filename, 'a')
+        return self.journal_file
+
+    def _close_journal(self):
+        if self.sync_timer:
+            self.sync_timer.cancel()
+            self.sync_timer = None
+        if self.journal_file:
+            self.journal_file.close()
+            self.journal_file = None
+
+    # return None if there is no file yet, raise DataStorageError if it can't be read
+    @timed
+    def load_data(self):
+        if not os.path.exists(self.filename):
+            return None
+        try:
+            cinema, meta = self.read_cinema()
+            self.journal_seq = meta.get("journal_seq", 0)
+            self.records_since_snapshot = 0
+            start = time.perf_counter()
+            self.replay_journal(cinema, self.journal_seq)
+            self.load_timings["journal"] = time.perf_counter() - start
+            cinema.clear_dirty()
+            return cinema
+        except Exception as e:
+            # the file is there but unreadable, it must not be mistaken for no data
+            raise DataStorageError(f"Error loading {self.filename}: {e}") from e
+
+    def replay_journal(self, cinema, snapshot_seq):
+        if not os.path.exists(self.journal_filename):
+            return
+        valid_size = 0
+        # new screenings in a row (a schedule import) are added in one go, see Cinema.add_screenings
+        new_screenings = {}
+        with open(self.journal_filename, 'rb') as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                # torn write at the end of the journal after a crash
+                if record is None or not line.endswith(b"\n"):
+                    break
+                valid_size += len(line)
+                # records already folded into the snapshot
+                if record["seq"] <= snapshot_seq:
+                    continue
+                data = record["data"]
+                if record["type"] == "screening" and data["id"] not in new_screenings and not cinema.get_screening_by_id(data["id"]):
+                    new_screenings[data["id"]] = self.screening_from_dict(data, cinema.get_screening_room_by_id(data["room_id"]))
+                else:
+                    self.add_new_screenings(cinema, new_screenings)
+                    self.apply_record(cinema, record["type"], data)
+                self.journal_seq = record["seq"]
+                self.records_since_snapshot += 1
+        self.add_new_screenings(cinema, new_screenings)
+
+        # drop the torn tail so new records are not appended after garbage
+        if valid_size < os.path.getsize(self.journal_filename):
+            with open(self.journal_filename, 'r+b') as file:
+                file.truncate(valid_size)
+
+    def add_new_screenings(self, cinema, new_screenings):
+        if new_screenings:
+            cinema.add_screenings(list(new_screenings.values()))
+            new_screenings.clear()
+
+    def apply_record(self, cinema, kind, data):
+        if kind == "screening_room":
+            if not cinema.get_screening_room_by_id(data["id"]):
+                cinema.add_screening_room(self.room_from_dict(data))
+        elif kind == "movie":
+            movie = self.movie_from_dict(data)
+            existing = cinema.get_movie_by_id(movie.id)
+            if existing:
+                existing.title = movie.title
+                existing.duration = movie.duration
+                existing.rating = movie.rating
+                existing.description = movie.description
+            else:
+                cinema.add_movie(movie)
+        elif kind == "screening":
+            screening = self.screening_from_dict(data, cinema.get_screening_room_by_id(data["room_id"]))
+            existing = cinema.get_screening_by_id(screening.id)
+            if existing:
+                existing.price = screening.price
+                cinema.update_screening_time(existing, screening.start_time)
+            else:
+                cinema.add_screening(screening)
+        elif kind == "reservation":
+            # a full save of the cinema in memory can hold it before its record is written;
+            # seats that are already taken stop the load with ValueError
+            if not cinema.has_reservation(data["id"]):
+                cinema.add_reservation(self.reservation_from_dict(data))
+        elif kind == "cancellation":
+            # the id stays taken even if the reservation was cancelled before it was written
+            cinema.note_reservation_id(data["id"])
+            # with fast_start this loads the deferred reservations, compaction
+            # folds the cancellations into the snapshot again
+            reservation = cinema.get_reservation_by_id(data["id"])
+            if reservation:
+                kept = set(tuple(seat) for seat in data["seats"])
+                cinema.release_reservation_seats(reservation, [seat for seat in reservation.seats if seat not in kept])
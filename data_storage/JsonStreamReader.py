@@ -0,0 +1,104 @@
+import json
+import re
+
+WHITESPACE = " \t\n\r"
+# what is left of the buffer could still be part of a number
+NUMBER_TAIL = re.compile(r"[0-9+\-.eE]*\Z")
+
+'''
+Json Stream Reader
+reads a JSON document chunk by chunk, one value at a time, so the top level
+object can be walked section by section and big arrays element by element
+without holding the whole file as Python objects.
+'''
+class JsonStreamReader:
+    def __init__(self, file, chunk_size=1 << 20):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _skip_whitespace(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self._fill():
+                return
+
+    def peek(self):
+        self._skip_whitespace()
+        if self.pos >= len(self.buffer):
+            raise ValueError("Unexpected end of JSON document")
+        return self.buffer[self.pos]
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' at offset {self.pos}, found '{self.buffer[self.pos]}'")
+        self.pos += 1
+
+    def read_value(self):
+        self._skip_whitespace()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                # the value continues in the next chunk
+                if self._fill():
+                    continue
+                raise
+            # a number may go on in the next chunk: raw_decode reads "1." or
+            # "1e" at the end of the buffer as 1, so anything left behind that
+            # can still belong to the number counts as unfinished
+            if (not self.eof and self.buffer[self.pos] in "-0123456789"
+                    and NUMBER_TAIL.match(self.buffer, end) and self._fill()):
+                continue
+            self.pos = end
+            return value
+
+    # walk the keys of an object, the caller reads each value
+    def iter_keys(self):
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.read_value()
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("}")
+            return
+
+    def iter_array(self):
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.read_value()
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("]")
+            return
+
+    # everything not read yet, as text
+    def read_remaining(self):
+        rest = self.buffer[self.pos:] + self.file.read()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = True
+        return rest
@@ -0,0 +1,231 @@
+from data_storage.DataStorage import DataStorage, DataStorageError
+from instrumentation.Metrics import timed
+
+import json
+import os
+import sqlite3
+import sys
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS movies (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    duration INTEGER NOT NULL,
+    rating TEXT,
+    description TEXT
+);
+CREATE TABLE IF NOT EXISTS screening_rooms (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    cols INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS screenings (
+    id INTEGER PRIMARY KEY,
+    movie_id INTEGER NOT NULL,
+    room_id INTEGER NOT NULL,
+    start_time TEXT NOT NULL,
+    price REAL NOT NULL,
+    seat_map BLOB
+);
+CREATE TABLE IF NOT EXISTS reservations (
+    id INTEGER PRIMARY KEY,
+    screening_id INTEGER NOT NULL,
+    customer_name TEXT NOT NULL,
+    customer_email TEXT NOT NULL,
+    seats TEXT NOT NULL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_screenings_movie_id ON screenings (movie_id);
+CREATE INDEX IF NOT EXISTS idx_screenings_start_time ON screenings (start_time);
+CREATE INDEX IF NOT EXISTS idx_reservations_screening_id ON reservations (screening_id);
+'''
+
+'''
+SQLite storage: same load_data/save_data contract as DataStorage, but single
+movies, screenings and reservations are written as single rows.
+'''
+class SqliteStorage(DataStorage):
+    def __init__(self, filename):
+        super().__init__(filename)
+        self.connection = None
+
+    def connect(self):
+        if not self.connection:
+            self.connection = sqlite3.connect(self.filename, check_same_thread=False)
+            self.connection.row_factory = sqlite3.Row
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.executescript(SCHEMA)
+        return self.connection
+
+    def close(self):
+        with self.lock:
+            if self.connection:
+                self.connection.close()
+                self.connection = None
+
+    @timed
+    def save_data(self, cinema):
+        with self.lock:
+            # rows of one moment, see DataStorage.write_cinema
+            with cinema.lock:
+                newest_reservation_id = cinema.get_newest_reservation_id()
+                movies = [self.movie_row(m) for m in cinema.movies]
+                rooms = [self.room_row(r) for r in cinema.screening_rooms]
+                screenings = [self.screening_row(s) for s in cinema.screenings]
+                reservations = [self.reservation_row(r) for r in cinema.reservations]
+            connection = self.connect()
+            with connection:
+                for table in ("movies", "screening_rooms", "screenings", "reservations"):
+                    connection.execute(f"DELETE FROM {table}")
+                connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('name', ?)", (cinema.name,))
+                self.note_reservation_id(connection, newest_reservation_id)
+                connection.executemany("INSERT INTO movies VALUES (?, ?, ?, ?, ?)", movies)
+                connection.executemany("INSERT INTO screening_rooms VALUES (?, ?, ?, ?)", rooms)
+                connection.executemany("INSERT INTO screenings VALUES (?, ?, ?, ?, ?, ?)", screenings)
+                connection.executemany("INSERT INTO reservations VALUES (?, ?, ?, ?, ?, ?)", reservations)
+
+    def save_movie(self, cinema, movie):
+        self.insert_movie(movie)
+
+    def save_screening(self, cinema, screening):
+        self.insert_screening(screening)
+
+    def save_reservation(self, cinema, reservation):
+        self.insert_reservation(reservation, cinema.get_screening_by_id(reservation.screening_id))
+
+    def save_cancellation(self, cinema, reservation):
+        self.save_changes(cinema, {"cancellations": [reservation]})
+
+    # all changes are written in one transaction
+    @timed
+    def save_changes(self, cinema, changes):
+        with self.lock:
+            connection = self.connect()
+            with connection:
+                connection.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('name', ?)", (cinema.name,))
+                connection.executemany("INSERT OR REPLACE INTO screening_rooms VALUES (?, ?, ?, ?)",
+                                       [self.room_row(r) for r in changes.get("screening_rooms", [])])
+                connection.executemany("INSERT OR REPLACE INTO movies VALUES (?, ?, ?, ?, ?)",
+                                       [self.movie_row(m) for m in changes.get("movies", [])])
+                connection.executemany("INSERT OR REPLACE INTO screenings VALUES (?, ?, ?, ?, ?, ?)",
+                                       [self.screening_row(s) for s in changes.get("screenings", [])])
+                reservations = changes.get("reservations", [])
+                connection.executemany("INSERT OR REPLACE INTO reservations VALUES (?, ?, ?, ?, ?, ?)",
+                                       [self.reservation_row(r) for r in reservations])
+                # cancelled reservations are deleted, partly cancelled ones keep the seats they have left
+                cancellations = changes.get("cancellations", [])
+                connection.executemany("DELETE FROM reservations WHERE id = ?",
+                                       [(r.id,) for r in cancellations if not r.seat_count()])
+                connection.executemany("UPDATE reservations SET seats = ? WHERE id = ?",
+                                       [(json.dumps(r.seats), r.id) for r in cancellations if r.seat_count()])
+                if reservations or cancellations:
+                    self.note_reservation_id(connection, max(r.id for r in reservations + cancellations))
+                # seats of the screenings that got new or cancelled reservations,
+                # a screening without a room has no seat map to write
+                screenings = {r.screening_id: cinema.get_screening_by_id(r.screening_id) for r in reservations + cancellations}
+                connection.executemany("UPDATE screenings SET seat_map = ? WHERE id = ?",
+                                       [(s.seat_map.to_bytes(), s.id) for s in screenings.values() if s and s.seat_map])
+
+    def insert_movie(self, movie):
+        with self.lock:
+            connection = self.connect()
+            with connection:
+                connection.execute("INSERT OR REPLACE INTO movies VALUES (?, ?, ?, ?, ?)", self.movie_row(movie))
+
+    def insert_screening(self, screening):
+        with self.lock:
+            connection = self.connect()
+            with connection:
+                connection.execute("INSERT OR REPLACE INTO screenings VALUES (?, ?, ?, ?, ?, ?)", self.screening_row(screening))
+
+    # the reservation row and the seats of its screening are written in one transaction
+    @timed
+    def insert_reservation(self, reservation, screening=None):
+        with self.lock:
+            connection = self.connect()
+            with connection:
+                connection.execute("INSERT OR REPLACE INTO reservations VALUES (?, ?, ?, ?, ?, ?)", self.reservation_row(reservation))
+                self.note_reservation_id(connection, reservation.id)
+                if screening and screening.seat_map:
+                    connection.execute("UPDATE screenings SET seat_map = ? WHERE id = ?",
+                                       (screening.seat_map.to_bytes(), screening.id))
+
+    # highest reservation id ever written, it stays when that reservation is cancelled
+    def note_reservation_id(self, connection, reservation_id):
+        connection.execute(
+            "INSERT INTO meta (key, value) VALUES ('newest_reservation_id', ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = MAX(CAST(value AS INTEGER), CAST(excluded.value AS INTEGER))",
+            (reservation_id,)
+        )
+
+    def movie_row(self, m):
+        data = self.movie_to_dict(m)
+        return (data["id"], data["title"], data["duration"], data["rating"], data["description"])
+
+    def room_row(self, r):
+        data = self.room_to_dict(r)
+        return (data["id"], data["name"], data["rows"], data["cols"])
+
+    def screening_row(self, s):
+        seat_map = s.seat_map.to_bytes() if s.seat_map else None
+        return (s.id, s.movie_id, s.room_id, s.start_time.strftime("%Y-%m-%d %H:%M"), s.price, seat_map)
+
+    def reservation_row(self, r):
+        data = self.reservation_to_dict(r)
+        return (data["id"], data["screening_id"], data["customer_name"], data["customer_email"], json.dumps(data["seats"]), data["timestamp"])
+
+    # return None if there is no data yet, raise DataStorageError if it can't be read
+    @timed
+    def load_data(self):
+        if not os.path.exists(self.filename):
+            return None
+        try:
+            with self.lock:
+                connection = self.connect()
+                name = connection.execute("SELECT value FROM meta WHERE key = 'name'").fetchone()
+                if not name:
+                    return None
+                data = {"name": name["value"]}
+                newest = connection.execute("SELECT value FROM meta WHERE key = 'newest_reservation_id'").fetchone()
+                data["movies"] = [dict(row) for row in connection.execute("SELECT * FROM movies ORDER BY id")]
+                data["screening_rooms"] = [dict(row) for row in connection.execute("SELECT * FROM screening_rooms ORDER BY id")]
+                data["screenings"] = [dict(row) for row in connection.execute("SELECT * FROM screenings ORDER BY id")]
+                data["reservations"] = []
+                for row in connection.execute("SELECT * FROM reservations ORDER BY id"):
+                    reservation_data = dict(row)
+                    reservation_data["seats"] = json.loads(reservation_data["seats"])
+                    data["reservations"].append(reservation_data)
+            self.load_timings = {}
+            cinema = self.cinema_from_dict(data)
+            if newest:
+                cinema.note_reservation_id(int(newest["value"]))
+            return cinema
+        except Exception as e:
+            # the file is there but unreadable, it must not be mistaken for no data
+            raise DataStorageError(f"Error loading {self.filename}: {e}") from e
+
+    # one-shot migration from the JSON file written by DataStorage
+    def migrate_from_json(self, json_filename):
+        cinema = DataStorage(json_filename).load_data()
+        if not cinema:
+            return False
+        self.save_data(cinema)
+        return True
+
+
+if __name__ == "__main__":
+    # python -m data_storage.SqliteStorage cinema_data.json cinema_data.db
+    json_filename = sys.argv[1] if len(sys.argv) > 1 else "cinema_data.json"
+    db_filename = sys.argv[2] if len(sys.argv) > 2 else "cinema_data.db"
+    storage = SqliteStorage(db_filename)
+    if storage.migrate_from_json(json_filename):
+        print(f"Migrated {json_filename} to {db_filename}")
+    else:
+        print(f"Could not read {json_filename}")
+    storage.close()
@@ -0,0 +1,192 @@
+from collections import deque
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+
+# upper bounds of the histogram buckets in seconds, 1 microsecond to about 17 seconds
+BUCKET_BOUNDS = [0.000001 * 2 ** i for i in range(25)]
+
+'''
+Histogram
+latencies in exponential buckets, percentiles are read from the buckets
+'''
+class Histogram:
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    # upper bound of the bucket holding the percentile, at most the largest value seen
+    def percentile(self, percent):
+        if not self.count:
+            return None
+        wanted = self.count * percent / 100
+        seen = 0
+        for position, count in enumerate(self.counts):
+            seen += count
+            if seen >= wanted:
+                bound = BUCKET_BOUNDS[position] if position < len(BUCKET_BOUNDS) else self.max
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total_ms": self.total * 1000,
+            "mean_ms": self.total / self.count * 1000 if self.count else None,
+            "min_ms": self.min * 1000 if self.count else None,
+            "p50_ms": self.percentile(50) * 1000 if self.count else None,
+            "p90_ms": self.percentile(90) * 1000 if self.count else None,
+            "p99_ms": self.percentile(99) * 1000 if self.count else None,
+            "max_ms": self.max * 1000 if self.count else None,
+        }
+
+
+'''
+Metrics
+counters and timing histograms of the hot paths. Disabled by default: the
+timed wrappers then only check one flag before calling through. Enable it
+with configure(enabled=True) or the CINEMA_METRICS environment variable.
+Calls slower than slow_threshold seconds are kept in a slow log, and
+appended to slow_log_filename when one is set.
+'''
+class Metrics:
+    def __init__(self, enabled=False, slow_threshold=0.1, slow_log_filename=None):
+        self.enabled = enabled
+        self.slow_threshold = slow_threshold
+        self.slow_log_filename = slow_log_filename
+        self.counters = {}
+        self.timers = {} # name -> Histogram
+        self.slow_operations = deque(maxlen=100) # (wall clock time, name, seconds)
+        self.lock = threading.Lock()
+
+    def configure(self, enabled=None, slow_threshold=None, slow_log_filename=None):
+        if enabled is not None:
+            self.enabled = enabled
+        if slow_threshold is not None:
+            self.slow_threshold = slow_threshold
+        if slow_log_filename is not None:
+            self.slow_log_filename = slow_log_filename
+
+    def reset(self):
+        with self.lock:
+            self.counters = {}
+            self.timers = {}
+            self.slow_operations.clear()
+
+    def count(self, name, amount=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name, seconds):
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.timers.get(name)
+            if histogram is None:
+                histogram = self.timers[name] = Histogram()
+            histogram.add(seconds)
+            if seconds < self.slow_threshold:
+                return
+            self.slow_operations.append((time.time(), name, seconds))
+        self._log_slow(name, seconds)
+
+    def _log_slow(self, name, seconds):
+        if not self.slow_log_filename:
+            return
+        try:
+            with open(self.slow_log_filename, "a") as file:
+                file.write(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {name} {seconds * 1000:.1f} ms\n")
+        except OSError as e:
+            print(f"Error writing slow operation log: {e}")
+
+    # with metrics.timer("name"): ...
+    def timer(self, name):
+        return Timer(self, name)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "counters": dict(self.counters),
+                "timers": {name: histogram.to_dict() for name, histogram in sorted(self.timers.items())},
+                "slow_operations": [
+                    {"time": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(at)), "name": name, "ms": seconds * 1000}
+                    for at, name, seconds in self.slow_operations
+                ],
+            }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_text(self):
+        snapshot = self.snapshot()
+        lines = [f"{'timer':<44} {'count':>8} {'mean ms':>10} {'p50 ms':>10} {'p99 ms':>10} {'max ms':>10}"]
+        for name, timer in snapshot["timers"].items():
+            lines.append(f"{name:<44} {timer['count']:8d} {timer['mean_ms']:10.3f} {timer['p50_ms']:10.3f} {timer['p99_ms']:10.3f} {timer['max_ms']:10.3f}")
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f"{name:<44} {value:8d}")
+        for operation in snapshot["slow_operations"]:
+            lines.append(f"slow: {operation['time']} {operation['name']} {operation['ms']:.1f} ms")
+        return "\n".join(lines) + "\n"
+
+    # .json files get the JSON export, anything else the text table
+    def write(self, filename):
+        text = self.to_json() if filename.endswith(".json") else self.to_text()
+        with open(filename, "w") as file:
+            file.write(text)
+
+
+class Timer:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+metrics = Metrics(
+    enabled=bool(os.environ.get("CINEMA_METRICS")),
+    slow_log_filename=os.environ.get("CINEMA_SLOW_LOG")
+)
+
+# time every call of the decorated function under its qualified name, e.g. "DataStorage.save_data"
+def timed(function):
+    name = function.__qualname__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if not metrics.enabled:
+            return function(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            metrics.observe(name, time.perf_counter() - start)
+    return wrapper
@@ -1,14 +1,21 @@
 from models.Cinema import Cinema
 from models.Movie import Movie
 from models.Screening import Screening
-from datetime import datetime
+from instrumentation.Metrics import timed
+from datetime import datetime, time, timedelta
+import csv
+import json
+import os
 
 class AdminManager:
-    def __init__(self, cinema):
+    # cleaning_minutes: time the room needs between two screenings
+    def __init__(self, cinema, cleaning_minutes=15):
         self.cinema = cinema
-        self.next_movie_id = cinema.get_newest_screening_id() + 1
+        self.next_movie_id = cinema.get_newest_movie_id() + 1
         self.next_screening_id = cinema.get_newest_screening_id() + 1
+        self.cleaning_buffer = timedelta(minutes=cleaning_minutes)
     
+    @timed
     def add_movie(self, title, duration, rating, description):
         movie = Movie(
             self.next_movie_id,
@@ -21,14 +28,135 @@ class AdminManager:
         self.cinema.add_movie(movie)
         return movie
     
-    def add_screening(self, movie_id, room_id, start_time, price):
-        screening = Screening(
-            self.next_screening_id,
-            movie_id,
-            room_id,
-            start_time,
-            price
+    # screenings in the room that would not leave the cleaning buffer free
+    def find_conflicts(self, movie_id, room_id, start_time):
+        movie = self.cinema.get_movie_by_id(movie_id)
+        end_time = start_time + timedelta(minutes=movie.duration if movie else 0)
+        return self.cinema.get_overlapping_screenings(
+            room_id, start_time - self.cleaning_buffer, end_time + self.cleaning_buffer
         )
-        self.next_screening_id += 1
-        self.cinema.add_screening(screening)
-        return screening
\ No newline at end of file
+    
+    # raise ValueError if the room is not free at that time
+    @timed
+    def add_screening(self, movie_id, room_id, start_time, price):
+        # check and add under the lock so two screenings can not take the same slot
+        with self.cinema.lock:
+            conflicts = self.find_conflicts(movie_id, room_id, start_time)
+            if conflicts:
+                conflict = min(conflicts, key=lambda s: s.start_time)
+                raise ValueError(f"The screening room is in use by screening {conflict.id} at {conflict.start_time.strftime('%Y-%m-%d %H:%M')}")
+
+            screening = Screening(
+                self.next_screening_id,
+                movie_id,
+                room_id,
+                start_time,
+                price
+            )
+            self.next_screening_id += 1
+            self.cinema.add_screening(screening)
+        return screening
+    
+    # every pair of screenings in the same room closer than the cleaning buffer
+    @timed
+    def validate_schedule(self):
+        report = []
+        for screening in self.cinema.screenings:
+            end_time = self.cinema.get_screening_end(screening)
+            for other in self.cinema.get_overlapping_screenings(
+                    screening.room_id, screening.start_time - self.cleaning_buffer, end_time + self.cleaning_buffer):
+                if screening.id < other.id:
+                    report.append((screening, other))
+        return report
+    
+    # entries: (movie_id, room_id, start_time, price), added all together or
+    # not at all; raise ValueError listing the problems found
+    @timed
+    def add_screenings(self, entries):
+        with self.cinema.lock:
+            errors = []
+            by_room = {}
+            for number, (movie_id, room_id, start_time, price) in enumerate(entries, 1):
+                movie = self.cinema.get_movie_by_id(movie_id)
+                if not movie:
+                    errors.append(f"entry {number}: movie {movie_id} not exists")
+                elif not self.cinema.get_screening_room_by_id(room_id):
+                    errors.append(f"entry {number}: screening room {room_id} doesn't exist")
+                elif price < 0:
+                    errors.append(f"entry {number}: negative price")
+                else:
+                    end_time = start_time + timedelta(minutes=movie.duration)
+                    by_room.setdefault(room_id, []).append((start_time, end_time, number))
+            for room_id, new_slots in by_room.items():
+                errors += self._room_conflicts(room_id, new_slots)
+            if errors:
+                shown = "\n".join(errors[:10])
+                more = f"\n... and {len(errors) - 10} more" if len(errors) > 10 else ""
+                raise ValueError(f"Schedule not added, {len(errors)} problem(s) found:\n{shown}{more}")
+
+            first_id = self.next_screening_id
+            screenings = [
+                Screening(first_id + offset, movie_id, room_id, start_time, price)
+                for offset, (movie_id, room_id, start_time, price) in enumerate(entries)
+            ]
+            self.next_screening_id += len(screenings)
+            self.cinema.add_screenings(screenings)
+        return screenings
+    
+    # one sweep over the old and new screenings of the room in start order,
+    # only problems involving a new screening are reported
+    def _room_conflicts(self, room_id, new_slots):
+        slots = [(s.start_time, self.cinema.get_screening_end(s), False, f"screening {s.id}")
+                 for s in self.cinema.get_screenings_by_room(room_id)]
+        slots += [(start_time, end_time, True, f"entry {number}") for start_time, end_time, number in new_slots]
+        slots.sort(key=lambda slot: slot[0])
+        errors = []
+        busy = None # the slot that keeps the room busy the longest so far
+        for slot in slots:
+            start_time, end_time, is_new, name = slot
+            if busy and start_time < busy[1] + self.cleaning_buffer and (is_new or busy[2]):
+                errors.append(f"{name} and {busy[3]} overlap in room {room_id} at {start_time.strftime('%Y-%m-%d %H:%M')}")
+            if not busy or end_time > busy[1]:
+                busy = slot
+        return errors
+    
+    # screenings of a week schedule file, .csv with a header line or .json list,
+    # both with the fields movie_id, room_id, start_time ("YYYY-MM-DD HH:MM") and price
+    def read_schedule(self, filename):
+        if os.path.splitext(filename)[1].lower() == ".csv":
+            with open(filename, newline="") as file:
+                rows = list(csv.DictReader(file))
+        else:
+            with open(filename, "r") as file:
+                rows = json.load(file)
+            if isinstance(rows, dict):
+                rows = rows.get("screenings", [])
+        entries = []
+        for number, row in enumerate(rows, 1):
+            try:
+                entries.append((
+                    int(row["movie_id"]),
+                    int(row["room_id"]),
+                    datetime.fromisoformat(row["start_time"]),
+                    float(row["price"])
+                ))
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"entry {number}: invalid screening {row}: {e}")
+        return entries
+    
+    @timed
+    def import_schedule(self, filename):
+        return self.add_screenings(self.read_schedule(filename))
+    
+    # entries for the movie every day from first_date to last_date at the given
+    # times ("HH:MM" or time), weekdays limits them to some days (Monday = 0)
+    def generate_screenings(self, movie_id, room_id, first_date, last_date, times, price, weekdays=None):
+        times = sorted(t if isinstance(t, time) else time.fromisoformat(t) for t in times)
+        entries = []
+        day = first_date
+        while day <= last_date:
+            if weekdays is None or day.weekday() in weekdays:
+                for start in times:
+                    entries.append((movie_id, room_id, datetime.combine(day, start), price))
+            day += timedelta(days=1)
+        return entries
\ No newline at end of file
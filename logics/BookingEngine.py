@@ -0,0 +1,63 @@
+import threading
+
+'''
+Booking Engine
+lets many threads (ticket counters, web requests) book through one
+ReservationManager. Bookings for the same screening are serialized by one of
+a fixed number of stripe locks, bookings for different screenings mostly
+run in parallel. Seats are checked and taken atomically by the screening,
+reservation ids come from the manager's thread safe allocator.
+'''
+class BookingEngine:
+    def __init__(self, reservation_manager, data_storage=None, stripes=64):
+        self.reservation_manager = reservation_manager
+        self.data_storage = data_storage
+        self.locks = [threading.Lock() for _ in range(stripes)]
+
+    def lock_for(self, screening_id):
+        return self.locks[hash(screening_id) % len(self.locks)]
+
+    # same result as ReservationManager.make_reservation: (True, reservation) or (False, message)
+    def book(self, screening_id, customer_name, customer_email, seats):
+        with self.lock_for(screening_id):
+            success, result = self.reservation_manager.make_reservation(
+                screening_id, customer_name, customer_email, seats
+            )
+            # persist while holding the stripe so records of a screening are written in booking order
+            if success and self.data_storage:
+                self.data_storage.save_reservation(self.reservation_manager.cinema, result)
+        return success, result
+
+    # same result as ReservationManager.cancel_seats: (True, refund) or (False, message),
+    # all seats of the reservation when seats is None
+    def cancel(self, reservation_id, seats=None):
+        cinema = self.reservation_manager.cinema
+        reservation = cinema.get_reservation_by_id(reservation_id)
+        if not reservation:
+            return False, "The reservation doesn't exist"
+        with self.lock_for(reservation.screening_id):
+            if seats is None:
+                success, result = self.reservation_manager.cancel_reservation(reservation_id)
+            else:
+                success, result = self.reservation_manager.cancel_seats(reservation_id, seats)
+            if success and self.data_storage:
+                self.data_storage.save_cancellation(cinema, reservation)
+        return success, result
+
+
+    # same result as ReservationManager.make_reservations, the new reservations
+    # are persisted with one save_changes call
+    def book_many(self, requests):
+        # stripes in a fixed order, so two batches can not wait for each other
+        stripes = sorted({hash(request[0]) % len(self.locks) for request in requests})
+        for stripe in stripes:
+            self.locks[stripe].acquire()
+        try:
+            results = self.reservation_manager.make_reservations(requests)
+            booked = [result for success, result in results if success]
+            if booked and self.data_storage:
+                self.data_storage.save_changes(self.reservation_manager.cinema, {"reservations": booked})
+        finally:
+            for stripe in stripes:
+                self.locks[stripe].release()
+        return results
\ No newline at end of file
@@ -0,0 +1,98 @@
+from models.SeatHold import SeatHold
+from logics.IdAllocator import IdAllocator
+from logics.ReservationManager import seats_unavailable_message
+
+import heapq
+import threading
+import time
+
+'''
+Hold Manager
+keeps seats of a customer on hold between seat selection and booking.
+Expiry times sit in a heap, so expiring holds only looks at the holds
+that are due instead of every screening.
+'''
+class HoldManager:
+    def __init__(self, cinema, reservation_manager, hold_seconds=300, clock=time.monotonic):
+        self.cinema = cinema
+        self.reservation_manager = reservation_manager
+        self.hold_seconds = hold_seconds
+        self.clock = clock
+        self.holds = {}
+        self.expiry_heap = [] # (expires_at, hold id)
+        self.id_allocator = IdAllocator()
+        self.lock = threading.Lock()
+
+    def place_hold(self, screening_id, seats, hold_seconds=None):
+        self.expire_holds()
+        screening = self.cinema.get_screening_by_id(screening_id)
+        if not screening:
+            return False, "The screening doesn't exist"
+
+        hold_id = self.id_allocator.allocate()
+        conflicts = screening.try_hold_seats(hold_id, seats)
+        if conflicts:
+            return False, seats_unavailable_message(conflicts)
+        return True, self._track(hold_id, screening_id, seats, hold_seconds)
+
+    # hold the best count adjacent seats of the screening, same result as place_hold
+    def place_best_hold(self, screening_id, count, hold_seconds=None):
+        self.expire_holds()
+        screening = self.cinema.get_screening_by_id(screening_id)
+        if not screening:
+            return False, "The screening doesn't exist"
+
+        hold_id = self.id_allocator.allocate()
+        seats = screening.try_hold_best_seats(hold_id, count)
+        if not seats:
+            return False, f"No {count} adjacent seats are available"
+        return True, self._track(hold_id, screening_id, seats, hold_seconds)
+
+    def _track(self, hold_id, screening_id, seats, hold_seconds):
+        expires_at = self.clock() + (self.hold_seconds if hold_seconds is None else hold_seconds)
+        hold = SeatHold(hold_id, screening_id, list(seats), expires_at)
+        with self.lock:
+            self.holds[hold_id] = hold
+            heapq.heappush(self.expiry_heap, (expires_at, hold_id))
+        return hold
+
+    # turn the hold into a reservation, same result as ReservationManager.make_reservation
+    def confirm_hold(self, hold_id, customer_name, customer_email):
+        self.expire_holds()
+        with self.lock:
+            hold = self.holds.pop(hold_id, None)
+        if not hold:
+            return False, "The seat hold has expired"
+        success, result = self.reservation_manager.make_reservation(
+            hold.screening_id, customer_name, customer_email, hold.seats, hold_id=hold.id
+        )
+        if not success:
+            self._release(hold)
+        return success, result
+
+    def release_hold(self, hold_id):
+        with self.lock:
+            hold = self.holds.pop(hold_id, None)
+        if hold:
+            self._release(hold)
+        return hold is not None
+
+    # release every hold that is due, return how many were released
+    def expire_holds(self, now=None):
+        now = self.clock() if now is None else now
+        expired = []
+        with self.lock:
+            while self.expiry_heap and self.expiry_heap[0][0] <= now:
+                _, hold_id = heapq.heappop(self.expiry_heap)
+                # confirmed and released holds are left in the heap and skipped here
+                hold = self.holds.pop(hold_id, None)
+                if hold:
+                    expired.append(hold)
+        for hold in expired:
+            self._release(hold)
+        return len(expired)
+
+    def _release(self, hold):
+        screening = self.cinema.get_screening_by_id(hold.screening_id)
+        if screening:
+            screening.release_hold(hold.id)
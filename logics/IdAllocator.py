@@ -0,0 +1,30 @@
+import threading
+
+'''
+Id Allocator
+hands out increasing ids, safe to share between threads
+'''
+class IdAllocator:
+    def __init__(self, next_id=1):
+        self.next_id = next_id
+        self.lock = threading.Lock()
+
+    def allocate(self):
+        with self.lock:
+            new_id = self.next_id
+            self.next_id += 1
+            return new_id
+
+    # reserve count consecutive ids at once, return them as a range
+    def allocate_block(self, count):
+        with self.lock:
+            first_id = self.next_id
+            self.next_id += count
+            return range(first_id, first_id + count)
+
+    def peek(self):
+        return self.next_id
+
+    def reset(self, next_id):
+        with self.lock:
+            self.next_id = next_id
@@ -0,0 +1,109 @@
+from models.Reservation import EPOCH
+
+from array import array
+from datetime import timedelta
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SECONDS_PER_DAY = 86400
+
+'''
+Reservation Columns
+column store of the reservations for reporting: one typed array per field
+instead of one object per reservation. Group-by aggregations use numpy
+when it is installed and a single pass over the arrays otherwise.
+'''
+class ReservationColumns:
+    def __init__(self):
+        self.screening_id = array("q")
+        self.movie_id = array("q")
+        self.room_id = array("q")
+        self.seat_count = array("l")
+        self.revenue = array("d")
+        self.booked_at = array("q") # seconds since EPOCH
+        self.starts_at = array("q") # seconds since EPOCH, start of the screening
+        self.room_capacity = {} # room id -> seats offered over all its screenings
+
+    @classmethod
+    def from_cinema(cls, cinema):
+        columns = cls()
+        for screening in cinema.screenings:
+            room = cinema.get_screening_room_by_id(screening.room_id)
+            if room:
+                columns.room_capacity[room.id] = columns.room_capacity.get(room.id, 0) + room.get_total_seats()
+        for reservation in cinema.reservations:
+            screening = cinema.get_screening_by_id(reservation.screening_id)
+            if screening:
+                columns.append(reservation, screening)
+        return columns
+
+    def append(self, reservation, screening):
+        seat_count = reservation.seat_count()
+        self.screening_id.append(reservation.screening_id)
+        self.movie_id.append(screening.movie_id)
+        self.room_id.append(screening.room_id)
+        self.seat_count.append(seat_count)
+        self.revenue.append(seat_count * screening.price)
+        self.booked_at.append(reservation.epoch_seconds)
+        self.starts_at.append(int((screening.start_time - EPOCH).total_seconds()))
+
+    def __len__(self):
+        return len(self.screening_id)
+
+    # zero-copy numpy view of a column
+    def _as_numpy(self, column):
+        if isinstance(column, array):
+            return np.frombuffer(column, dtype=column.typecode)
+        return column
+
+    # sum values per key, keys are integers
+    def _group_sum(self, keys, values):
+        if len(keys) == 0:
+            return {}
+        if np is not None:
+            keys = self._as_numpy(keys)
+            values = self._as_numpy(values)
+            offset = int(keys.min())
+            sums = np.bincount(keys - offset, weights=values)
+            present = np.bincount(keys - offset) > 0
+            return {int(key) + offset: float(sums[key]) for key in np.nonzero(present)[0]}
+        sums = {}
+        for key, value in zip(keys, values):
+            sums[key] = sums.get(key, 0) + value
+        return sums
+
+    def _days(self, seconds):
+        if np is not None:
+            return self._as_numpy(seconds) // SECONDS_PER_DAY
+        return array("q", [value // SECONDS_PER_DAY for value in seconds])
+
+    # date -> revenue, by the day of the screening or the day the booking was made
+    def daily_revenue(self, by="screening"):
+        seconds = self.starts_at if by == "screening" else self.booked_at
+        sums = self._group_sum(self._days(seconds), self.revenue)
+        return {(EPOCH + timedelta(days=day)).date(): total for day, total in sorted(sums.items())}
+
+    # room id -> share of the offered seats that were sold
+    def occupancy_by_room(self):
+        sold = self._group_sum(self.room_id, self.seat_count)
+        return {room_id: sold.get(room_id, 0) / capacity for room_id, capacity in self.room_capacity.items() if capacity}
+
+    # movie id -> (tickets, revenue)
+    def sales_by_movie(self):
+        tickets = self._group_sum(self.movie_id, self.seat_count)
+        revenue = self._group_sum(self.movie_id, self.revenue)
+        return {movie_id: (int(tickets[movie_id]), revenue[movie_id]) for movie_id in tickets}
+
+    # 7 x 24 tickets sold, weekday (Monday = 0) by hour of the screening start
+    def hourly_heatmap(self):
+        if np is not None:
+            starts = self._as_numpy(self.starts_at)
+            # 1970-01-01 was a Thursday
+            cells = ((starts // SECONDS_PER_DAY + 3) % 7) * 24 + starts % SECONDS_PER_DAY // 3600
+        else:
+            cells = array("q", [((start // SECONDS_PER_DAY + 3) % 7) * 24 + start % SECONDS_PER_DAY // 3600 for start in self.starts_at])
+        sums = self._group_sum(cells, self.seat_count)
+        return [[int(sums.get(weekday * 24 + hour, 0)) for hour in range(24)] for weekday in range(7)]
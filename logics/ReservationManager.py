@@ -1,32 +1,164 @@
 from models.Cinema import Cinema
 from models.Reservation import Reservation
+from logics.IdAllocator import IdAllocator
+from instrumentation.Metrics import metrics, timed
 
 from datetime import datetime
 
+# Reservation packs every row and column into 16 bits
+MAX_SEAT_NUMBER = 0xFFFF
+
+def seats_unavailable_message(conflicts):
+    if len(conflicts) == 1:
+        return f"Seat {conflicts[0]} is not available"
+    return f"Seats {', '.join(str(seat) for seat in conflicts)} are not available"
+
+def seats_not_booked_message(seats):
+    if len(seats) == 1:
+        return f"Seat {seats[0]} is not part of the reservation"
+    return f"Seats {', '.join(str(seat) for seat in seats)} are not part of the reservation"
+
+# raise ValueError for a request that cannot become a Reservation at all
+def check_reservation_request(customer_name, customer_email, seats):
+    if not isinstance(customer_name, str):
+        raise ValueError(f"The customer name must be text, not {type(customer_name).__name__}")
+    if not isinstance(customer_email, str):
+        raise ValueError(f"The customer email must be text, not {type(customer_email).__name__}")
+    if not isinstance(seats, (list, tuple)):
+        raise ValueError(f"The seats must be a list of (row, col) pairs, not {type(seats).__name__}")
+    for seat in seats:
+        # bool is an int too, but never a seat number
+        if not (isinstance(seat, tuple) and len(seat) == 2
+                and all(type(value) is int and 0 <= value <= MAX_SEAT_NUMBER for value in seat)):
+            raise ValueError(f"Seat {seat!r} is not a (row, col) pair of whole numbers")
+
+
 class ReservationManager:
 
     def __init__(self, cinema):
         self.cinema = cinema
-        self.next_reservation_id = cinema.get_newest_reservation_id() + 1
+        self.id_allocator = IdAllocator(cinema.get_newest_reservation_id() + 1)
 
-    def make_reservation(self, screening_id, customer_name, customer_email, seats):
+    @property
+    def next_reservation_id(self):
+        return self.id_allocator.peek()
+
+    @next_reservation_id.setter
+    def next_reservation_id(self, next_id):
+        self.id_allocator.reset(next_id)
+
+    # hold_id: seats held by that hold may be reserved, see HoldManager
+    # raises ValueError for a malformed name, email or seat
+    @timed
+    def make_reservation(self, screening_id, customer_name, customer_email, seats, hold_id=None):
         screening = self.cinema.get_screening_by_id(screening_id)
 
         if not screening:
             return False, "The screening doesn't exist"
+        if not seats:
+            return False, "No seats selected"
+        check_reservation_request(customer_name, customer_email, seats)
+
+        # built before any seat is taken, so a bad request cannot leave seats
+        # reserved by nobody; the id is only given out once the seats are ours
+        reservation = Reservation(None, screening_id, customer_name, customer_email, list(seats))
+
+        # check and take all seats in one step, nothing is reserved on conflict.
+        # Under the cinema lock a snapshot sees the seats and the reservation
+        # together or neither of them
+        with self.cinema.lock:
+            conflicts = screening.try_reserve_seats(seats, hold_id)
+            if conflicts:
+                metrics.count("reservations.seat_conflicts")
+                return False, seats_unavailable_message(conflicts)
+
+            reservation.id = self.id_allocator.allocate()
+            self.cinema.add_reservation(reservation, reserve_seats=False)
+        metrics.count("reservations.booked")
+        return True, reservation
+
+
+    # requests: (screening_id, customer_name, customer_email, seats), e.g. a school
+    # group over several screenings. The requests of one screening are reserved
+    # together or not at all; returns one (True, reservation) or (False, message)
+    # per request, in the same order. Raises ValueError, before anything is
+    # reserved, when a request has a malformed name, email or seat
+    @timed
+    def make_reservations(self, requests):
+        for screening_id, customer_name, customer_email, seats in requests:
+            if seats:
+                check_reservation_request(customer_name, customer_email, seats)
+        results = [None] * len(requests)
+        reservations = {}
+        by_screening = {}
+        for number, (screening_id, customer_name, customer_email, seats) in enumerate(requests):
+            if not self.cinema.get_screening_by_id(screening_id):
+                results[number] = (False, "The screening doesn't exist")
+            elif not seats:
+                results[number] = (False, "No seats selected")
+            else:
+                # built before any seat is taken, see make_reservation
+                reservations[number] = Reservation(None, screening_id, customer_name, customer_email, list(seats))
+                by_screening.setdefault(screening_id, []).append(number)
+
+        # seats and reservations under one hold of the cinema lock, see make_reservation
+        with self.cinema.lock:
+            booked = []
+            for screening_id, numbers in by_screening.items():
+                screening = self.cinema.get_screening_by_id(screening_id)
+                seats = [seat for number in numbers for seat in requests[number][3]]
+                conflicts = set(screening.try_reserve_seats(seats))
+                if not conflicts:
+                    booked += numbers
+                    continue
+                for number in numbers:
+                    own_conflicts = [seat for seat in requests[number][3] if seat in conflicts]
+                    if own_conflicts:
+                        results[number] = (False, seats_unavailable_message(own_conflicts))
+                    else:
+                        results[number] = (False, "Other seats booked together for this screening are not available")
+
+            booked.sort()
+            for reservation_id, number in zip(self.id_allocator.allocate_block(len(booked)), booked):
+                reservation = reservations[number]
+                reservation.id = reservation_id
+                self.cinema.add_reservation(reservation, reserve_seats=False)
+                results[number] = (True, reservation)
+        metrics.count("reservations.booked", len(booked))
+        metrics.count("reservations.rejected", len(requests) - len(booked))
+        return results
+
+
+    # cancel the whole reservation, return (True, refund) or (False, message)
+    @timed
+    def cancel_reservation(self, reservation_id):
+        reservation = self.cinema.get_reservation_by_id(reservation_id)
+        if not reservation:
+            return False, "The reservation doesn't exist"
+        return self.cancel_seats(reservation_id, reservation.seats)
+
+    # give some seats of the reservation back, giving back all of them cancels
+    # the reservation; return (True, refund) or (False, message). The seats are
+    # free again right away, the cancellation is saved with the next changes
+    @timed
+    def cancel_seats(self, reservation_id, seats):
+        reservation = self.cinema.get_reservation_by_id(reservation_id)
+        if not reservation:
+            return False, "The reservation doesn't exist"
+        if not seats:
+            return False, "No seats selected"
+
+        booked = set(reservation.seats)
+        not_booked = [seat for seat in seats if seat not in booked]
+        if not_booked:
+            return False, seats_not_booked_message(not_booked)
 
-        for seat in seats:
-            if not screening.is_seat_available(seat):
-                return False, f"Seat {seat} is not available"
-
-        reservation = Reservation(
-            self.next_reservation_id,
-            screening_id,
-            customer_name,
-            customer_email,
-            seats
-        )
-
-        self.next_reservation_id += 1
-        self.cinema.add_reservation(reservation)
-        return True, reservation
\ No newline at end of file
+        released = self.cinema.release_reservation_seats(reservation, seats)
+        if not released:
+            # cancelled by someone else in the meantime
+            return False, "The reservation doesn't exist"
+        screening = self.cinema.get_screening_by_id(reservation.screening_id)
+        metrics.count("reservations.cancelled_seats", len(released))
+        if not reservation.seat_count():
+            metrics.count("reservations.cancelled")
+        return True, len(released) * screening.price if screening else 0.0
\ No newline at end of file
@@ -0,0 +1,113 @@
+import threading
+
+'''
+Availability
+seat counts of a screening, or summed over the screenings of a movie or a day
+'''
+class Availability:
+    __slots__ = ("capacity", "sold", "held", "screenings")
+
+    def __init__(self, capacity=0, sold=0, held=0, screenings=0):
+        self.capacity = capacity
+        self.sold = sold
+        self.held = held
+        self.screenings = screenings
+
+    @property
+    def free(self):
+        return self.capacity - self.sold - self.held
+
+    # share of the seats that were sold, 0.0 - 1.0
+    @property
+    def occupancy(self):
+        return self.sold / self.capacity if self.capacity else 0.0
+
+    @property
+    def sold_out(self):
+        return self.free <= 0
+
+    def copy(self):
+        return Availability(self.capacity, self.sold, self.held, self.screenings)
+
+
+'''
+Availability Cache
+seat counts per screening, per movie and per day, changed by the screenings
+every time seats are reserved, held or released, so availability questions
+are answered from counters without looking at any seat map.
+'''
+class AvailabilityCache:
+    def __init__(self):
+        self.by_screening = {} # screening id -> Availability
+        self.by_movie = {} # movie id -> Availability
+        self.by_day = {} # date -> Availability
+        self.lock = threading.Lock()
+
+    def _groups(self, screening):
+        day = screening.start_time.date()
+        return (
+            self.by_movie.setdefault(screening.movie_id, Availability()),
+            self.by_day.setdefault(day, Availability()),
+        )
+
+    # also used to count the seats again after they were changed all at once
+    def add(self, screening):
+        seat_map = screening.seat_map
+        held_map = screening.held_map
+        counts = Availability(
+            seat_map.get_total_seats() if seat_map else 0,
+            seat_map.reserved_count() if seat_map else 0,
+            held_map.reserved_count() if held_map else 0,
+            1
+        )
+        with self.lock:
+            self._remove(screening)
+            self.by_screening[screening.id] = counts
+            for group in self._groups(screening):
+                group.capacity += counts.capacity
+                group.sold += counts.sold
+                group.held += counts.held
+                group.screenings += 1
+
+    # the screening is about to change its movie or time, add it again afterwards
+    def remove(self, screening):
+        with self.lock:
+            self._remove(screening)
+
+    def _remove(self, screening):
+        counts = self.by_screening.pop(screening.id, None)
+        if not counts:
+            return
+        for group in self._groups(screening):
+            group.capacity -= counts.capacity
+            group.sold -= counts.sold
+            group.held -= counts.held
+            group.screenings -= 1
+
+    # sold and held: change of the number of sold and held seats
+    def update(self, screening, sold, held):
+        with self.lock:
+            counts = self.by_screening.get(screening.id)
+            if not counts:
+                return
+            counts.sold += sold
+            counts.held += held
+            for group in self._groups(screening):
+                group.sold += sold
+                group.held += held
+
+    def get_screening(self, screening_id):
+        counts = self.by_screening.get(screening_id)
+        return counts.copy() if counts else None
+
+    def get_movie(self, movie_id):
+        counts = self.by_movie.get(movie_id)
+        return counts.copy() if counts else Availability()
+
+    def get_day(self, day):
+        counts = self.by_day.get(day)
+        return counts.copy() if counts else Availability()
+
+    def free_seats(self, screening_id):
+        counts = self.by_screening.get(screening_id)
+        return counts.free if counts else 0
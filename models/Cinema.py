@@ -2,6 +2,13 @@ from models.Movie import Movie
 from models.ScreeningRoom import ScreeningRoom
 from models.Screening import Screening
 from models.Reservation import Reservation
+from models.ScheduleIndex import ScheduleIndex
+from models.IntervalTree import IntervalTree
+from models.AvailabilityCache import AvailabilityCache
+from models.CustomerIndex import CustomerIndex
+
+from datetime import datetime, timedelta
+import threading
 
 class Cinema:
     def __init__(self, name):
@@ -9,53 +16,316 @@ class Cinema:
         self.movies = []
         self.screening_rooms = []
         self.screenings = []
-        self.reservations = []
+        self._reservations = []
+
+        # historical reservations can be loaded on first use, see defer_reservations
+        self.deferred_reservations = None
+        self.deferred_newest_reservation_id = 0
+        # highest reservation id ever added, cancelled ones included, so that a
+        # cancelled reservation code is never handed out again; stored with the data
+        self.newest_reservation_id = 0
+
+        # indexes kept up to date by the add_* methods
+        self.movies_by_id = {}
+        self.rooms_by_id = {}
+        self.screenings_by_id = {}
+        self.schedule = ScheduleIndex() # screenings by start time, per room and per movie
+        self.room_intervals = {} # room id -> IntervalTree of the time each screening occupies the room
+        self.reservations_by_id = {}
+        self.reservations_by_screening = {}
+        self.availability = AvailabilityCache() # seat counts per screening, movie and day
+        self.customers = CustomerIndex() # reservations by customer email and name
+        self.lock = threading.RLock() # guards the lists and indexes above
+        # cancelled reservations still in _reservations, dropped on the next full read
+        self.removed_reservation_count = 0
+
+        # records changed since the last flush, id -> object; "cancellations" holds
+        # the reservations that gave seats back, with the seats they still have.
+        # Only filled while track_changes is on, see BackgroundWriter; callers
+        # that save every change themselves would keep these forever
+        self.track_changes = False
+        self.dirty = {"movies": {}, "screening_rooms": {}, "screenings": {}, "reservations": {}, "cancellations": {}}
     
     def add_movie(self, movie):
-        self.movies.append(movie)
+        with self.lock:
+            self.movies.append(movie)
+            self.movies_by_id[movie.id] = movie
+            self.mark_dirty("movies", movie)
     
     def add_screening_room(self, room):
-        self.screening_rooms.append(room)
+        with self.lock:
+            self.screening_rooms.append(room)
+            self.rooms_by_id[room.id] = room
+            self.mark_dirty("screening_rooms", room)
     
     def add_screening(self, screening):
-        self.screenings.append(screening)
+        room = self.rooms_by_id.get(screening.room_id)
+        if room:
+            screening.attach_room(room)
+        with self.lock:
+            self.screenings.append(screening)
+            self.screenings_by_id[screening.id] = screening
+            screening.availability = self.availability
+            self.availability.add(screening)
+            self.schedule.add(screening)
+            self.room_intervals.setdefault(screening.room_id, IntervalTree()).insert(
+                screening.start_time, self.get_screening_end(screening), screening.id, screening)
+            self.mark_dirty("screenings", screening)
     
-    def add_reservation(self, reservation):
-        self.reservations.append(reservation)
+    # many screenings at once, the indexes are rebuilt once instead of per screening
+    def add_screenings(self, screenings):
+        for screening in screenings:
+            room = self.rooms_by_id.get(screening.room_id)
+            if room:
+                screening.attach_room(room)
+        with self.lock:
+            self.screenings.extend(screenings)
+            for screening in screenings:
+                self.screenings_by_id[screening.id] = screening
+                self.mark_dirty("screenings", screening)
+                screening.availability = self.availability
+                self.availability.add(screening)
+            self.schedule.rebuild(self.screenings)
+            for room_id in {screening.room_id for screening in screenings}:
+                tree = self.room_intervals.setdefault(room_id, IntervalTree())
+                tree.rebuild([(s.start_time, self.get_screening_end(s), s.id, s)
+                              for s in self.schedule.select(room_id=room_id).screenings])
 
-        # look for the screening
-        screening = next((s for s in self.screenings if s.id == reservation.screening_id), None)
-        if screening:
-            screening.reserve_seats(reservation.seats)
+    # screenings must be moved through here to keep the schedule sorted
+    def update_screening_time(self, screening, start_time):
+        with self.lock:
+            self.schedule.remove(screening)
+            self.room_intervals[screening.room_id].remove(screening.start_time, screening.id)
+            self.availability.remove(screening)
+            reservations = self.reservations_by_screening.get(screening.id, [])
+            for reservation in reservations:
+                self.customers.remove(reservation, screening.start_time)
+            screening.start_time = start_time
+            self.schedule.add(screening)
+            self.availability.add(screening)
+            for reservation in reservations:
+                self.customers.add(reservation, start_time)
+            self.room_intervals[screening.room_id].insert(
+                screening.start_time, self.get_screening_end(screening), screening.id, screening)
+            self.mark_dirty("screenings", screening)
+
+    # reserve_seats=False when the seats were already taken on the screening,
+    # otherwise ValueError if any of them is taken and nothing is added
+    def add_reservation(self, reservation, reserve_seats=True):
+        screening = self.screenings_by_id.get(reservation.screening_id)
+        if screening and reserve_seats:
+            conflicts = screening.try_reserve_seats(reservation.seats)
+            if conflicts:
+                raise ValueError(f"Seats {conflicts} of reservation {reservation.id} are already taken")
+
+        with self.lock:
+            self._reservations.append(reservation)
+            self.reservations_by_id[reservation.id] = reservation
+            self.note_reservation_id(reservation.id)
+            self.reservations_by_screening.setdefault(reservation.screening_id, []).append(reservation)
+            self.customers.add(reservation, self.get_screening_start(reservation.screening_id))
+            self.mark_dirty("reservations", reservation)
     
+    # give seats of the reservation back, the reservation is removed once it has
+    # none left; O(seats) plus the reservations of the screening and the customer.
+    # Return the seats that were released
+    def release_reservation_seats(self, reservation, seats):
+        with self.lock:
+            if self.reservations_by_id.get(reservation.id) is not reservation:
+                return []
+            release = set(seats)
+            booked = reservation.seats
+            released = [seat for seat in booked if seat in release]
+            if not released:
+                return []
+            screening = self.screenings_by_id.get(reservation.screening_id)
+            if screening:
+                screening.release_seats(released)
+            reservation.seats = [seat for seat in booked if seat not in release]
+            if not reservation.seat_count():
+                self._remove_reservation(reservation)
+            self.mark_dirty("cancellations", reservation)
+            return released
+
+    def _remove_reservation(self, reservation):
+        del self.reservations_by_id[reservation.id]
+        self.reservations_by_screening[reservation.screening_id].remove(reservation)
+        self.customers.remove(reservation, self.get_screening_start(reservation.screening_id))
+        # never written, the cancellation alone is enough
+        self.dirty["reservations"].pop(reservation.id, None)
+        self.removed_reservation_count += 1
+
+    @property
+    def reservations(self):
+        self.load_deferred_reservations()
+        if self.removed_reservation_count:
+            with self.lock:
+                by_id = self.reservations_by_id
+                self._reservations = [r for r in self._reservations if by_id.get(r.id) is r]
+                self.removed_reservation_count = 0
+        return self._reservations
 
+    # loader returns the reservations stored on disk, their seats must already
+    # be reserved on the screenings; it runs the first time reservations are read
+    def defer_reservations(self, loader, newest_reservation_id):
+        with self.lock:
+            self.deferred_reservations = loader
+            self.deferred_newest_reservation_id = newest_reservation_id
+            self.note_reservation_id(newest_reservation_id)
+
+    def load_deferred_reservations(self):
+        if not self.deferred_reservations:
+            return
+        with self.lock:
+            loader = self.deferred_reservations
+            if not loader:
+                return
+            # cleared only once the loader succeeded: if it raises, the stored
+            # reservations are still there for the next try instead of being
+            # dropped, and a full save can not write a file without them
+            loaded = loader()
+            self.deferred_reservations = None
+            # reservations made in the meantime stay behind the older ones
+            self._reservations[:0] = loaded
+            by_screening = {}
+            for reservation in loaded:
+                self.reservations_by_id[reservation.id] = reservation
+                by_screening.setdefault(reservation.screening_id, []).append(reservation)
+            for screening_id, reservations in by_screening.items():
+                self.reservations_by_screening.setdefault(screening_id, [])[:0] = reservations
+                start_time = self.get_screening_start(screening_id)
+                for reservation in reservations:
+                    self.customers.add(reservation, start_time)
+
+    # changed records are tracked by kind, see self.dirty
+    def mark_dirty(self, kind, record):
+        if not self.track_changes:
+            return
+        with self.lock:
+            self.dirty[kind][record.id] = record
+
+    def dirty_count(self):
+        with self.lock:
+            return sum(len(records) for records in self.dirty.values())
+
+    # return the changed records and start tracking from scratch
+    def take_dirty(self):
+        with self.lock:
+            changes = {kind: list(records.values()) for kind, records in self.dirty.items()}
+            for records in self.dirty.values():
+                records.clear()
+            return changes
+
+    def clear_dirty(self):
+        self.take_dirty()
 
     def get_movies(self):
         return self.movies
     
     def get_screening_rooms(self):
         return self.screening_rooms
+
+    def get_movie_by_id(self, movie_id):
+        return self.movies_by_id.get(movie_id)
+
+    def get_screening_room_by_id(self, room_id):
+        return self.rooms_by_id.get(room_id)
     
+    # the room is busy from the start until the movie is over
+    def get_screening_end(self, screening):
+        movie = self.movies_by_id.get(screening.movie_id)
+        return screening.start_time + timedelta(minutes=movie.duration if movie else 0)
+
+    # screenings in the room whose running time overlaps [start, end)
+    def get_overlapping_screenings(self, room_id, start, end):
+        tree = self.room_intervals.get(room_id)
+        return tree.overlaps(start, end) if tree else []
+
+    # sorted by start time
     def get_screenings_by_movie(self, movie_id):
-        return [s for s in self.screenings if s.movie_id == movie_id]
+        return self.schedule.select(movie_id=movie_id).all()
+
+    # sorted by start time
+    def get_screenings_by_room(self, room_id):
+        return self.schedule.select(room_id=room_id).all()
+
+    # screenings starting in [start, end), sorted by start time
+    def get_screenings_between(self, start, end, room_id=None, movie_id=None):
+        return self.schedule.between(start, end, room_id, movie_id)
+
+    # the next count screenings starting at or after start
+    def get_upcoming_screenings(self, start, count, room_id=None, movie_id=None):
+        return self.schedule.upcoming(start, count, room_id, movie_id)
     
     def get_screening_by_id(self, screening_id):
-        return next((s for s in self.screenings if s.id == screening_id), None)
+        return self.screenings_by_id.get(screening_id)
+
+    # start time used to order a customer's reservations, datetime.min if the screening doesn't exist
+    def get_screening_start(self, screening_id):
+        screening = self.screenings_by_id.get(screening_id)
+        return screening.start_time if screening else datetime.min
+
+    # reservations of the customer, case and spaces in the email don't matter, sorted by screening time
+    def get_reservations_by_email(self, email):
+        self.load_deferred_reservations()
+        with self.lock:
+            return self.customers.find_by_email(email)
+
+    # reservations of the customers whose name starts with prefix, sorted by screening time
+    def find_reservations_by_name(self, prefix):
+        self.load_deferred_reservations()
+        with self.lock:
+            return self.customers.find_by_name_prefix(prefix)
+
+    # Availability of the screening, None if it doesn't exist
+    def get_screening_availability(self, screening_id):
+        return self.availability.get_screening(screening_id)
+
+    # Availability summed over all screenings of the movie
+    def get_movie_availability(self, movie_id):
+        return self.availability.get_movie(movie_id)
+
+    # Availability summed over the screenings starting on that date
+    def get_day_availability(self, day):
+        return self.availability.get_day(day)
+
+    # the next count screenings from start with at least min_seats free seats
+    def get_upcoming_with_seats(self, start, count, min_seats=1, room_id=None, movie_id=None):
+        timeline = self.schedule.select(room_id, movie_id)
+        free_seats = self.availability.free_seats
+        found = []
+        for screening in timeline.iter_from(start):
+            if free_seats(screening.id) >= min_seats:
+                found.append(screening)
+                if len(found) == count:
+                    break
+        return found
     
+    # deferred reservations are only loaded if one of them can have the id
+    def has_reservation(self, reservation_id):
+        if self.deferred_reservations and reservation_id <= self.deferred_newest_reservation_id:
+            self.load_deferred_reservations()
+        return reservation_id in self.reservations_by_id
+
+    # the reservation with that id, None if it doesn't exist or was cancelled
+    def get_reservation_by_id(self, reservation_id):
+        self.load_deferred_reservations()
+        return self.reservations_by_id.get(reservation_id)
+
     def get_reservations_by_screening(self, screening_id):
-        return [r for r in self.reservations if r.screening_id == screening_id]
+        self.load_deferred_reservations()
+        return list(self.reservations_by_screening.get(screening_id, []))
 
-    def get_screening_by_id(self, screening_id):
-        return next((s for s in self.screenings if s.id == screening_id), None)
 
 
+    # ids used by reservations that were cancelled since count as well
+    def note_reservation_id(self, reservation_id):
+        if reservation_id > self.newest_reservation_id:
+            self.newest_reservation_id = reservation_id
 
     def get_newest_reservation_id(self):
-        # the reseration id will increment by 1 always
-        if self.reservations==[]:
-            return 0
-        else:
-            return max([r.id for r in self.reservations])
+        # the reseration id will increment by 1 always, cancelled ids are not reused
+        return self.newest_reservation_id
     
     def get_newest_screening_id(self):
         # the screening id will increment by 1 always
@@ -69,4 +339,4 @@ class Cinema:
         if self.movies==[]:
             return 0
         else:
-            return max([m.id for m in self.movies])
\ No newline at end of file
+            return max([m.id for m in self.movies])
@@ -0,0 +1,66 @@
+import bisect
+import heapq
+
+def normalize_email(email):
+    return email.strip().lower()
+
+def normalize_name(name):
+    return " ".join(name.split()).casefold()
+
+
+'''
+Customer Index
+reservations by customer email and by customer name, each customer's list
+kept sorted by screening time, so a lookup returns its k reservations in
+O(k). Names are kept in a sorted list for prefix search; names added since
+the last search are sorted in on the next one.
+'''
+class CustomerIndex:
+    def __init__(self):
+        self.by_email = {} # normalized email -> [(start_time, reservation id, reservation)]
+        self.by_name = {} # normalized name -> [(start_time, reservation id, reservation)]
+        self.names = [] # normalized names, sorted when names_sorted is True
+        self.names_sorted = True
+
+    def add(self, reservation, start_time):
+        entry = (start_time, reservation.id, reservation)
+        bisect.insort(self.by_email.setdefault(normalize_email(reservation.customer_email), []), entry)
+        name = normalize_name(reservation.customer_name)
+        entries = self.by_name.get(name)
+        if entries is None:
+            entries = self.by_name[name] = []
+            self.names.append(name)
+            self.names_sorted = False
+        bisect.insort(entries, entry)
+
+    def remove(self, reservation, start_time):
+        entry = (start_time, reservation.id)
+        self._remove_entry(self.by_email.get(normalize_email(reservation.customer_email)), entry)
+        self._remove_entry(self.by_name.get(normalize_name(reservation.customer_name)), entry)
+
+    def _remove_entry(self, entries, entry):
+        if not entries:
+            return
+        position = bisect.bisect_left(entries, entry)
+        if position < len(entries) and entries[position][:2] == entry:
+            del entries[position]
+
+    def find_by_email(self, email):
+        return [entry[2] for entry in self.by_email.get(normalize_email(email), ())]
+
+    # reservations of every customer whose name starts with prefix, by screening time
+    def find_by_name_prefix(self, prefix):
+        prefix = normalize_name(prefix)
+        if not prefix:
+            return []
+        if not self.names_sorted:
+            self.names.sort()
+            self.names_sorted = True
+        position = bisect.bisect_left(self.names, prefix)
+        matches = []
+        while position < len(self.names) and self.names[position].startswith(prefix):
+            matches.append(self.by_name[self.names[position]])
+            position += 1
+        if len(matches) == 1:
+            return [entry[2] for entry in matches[0]]
+        return [entry[2] for entry in heapq.merge(*matches)]
@@ -0,0 +1,140 @@
+import random
+
+'''
+Interval Tree
+half-open intervals [start, end) in a treap ordered by (start, id); every
+node knows the largest end in its subtree, so an overlap query only walks
+the branches that can contain an overlapping interval.
+'''
+class IntervalNode:
+    __slots__ = ("key", "end", "value", "priority", "left", "right", "max_end")
+
+    def __init__(self, key, end, value, priority):
+        self.key = key # (start, id)
+        self.end = end
+        self.value = value
+        self.priority = priority
+        self.left = None
+        self.right = None
+        self.max_end = end
+
+    def update(self):
+        self.max_end = self.end
+        if self.left and self.left.max_end > self.max_end:
+            self.max_end = self.left.max_end
+        if self.right and self.right.max_end > self.max_end:
+            self.max_end = self.right.max_end
+
+
+class IntervalTree:
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def insert(self, start, end, id, value):
+        self.root = self._insert(self.root, IntervalNode((start, id), end, value, random.random()))
+        self.size += 1
+
+    def _insert(self, node, new_node):
+        if node is None:
+            return new_node
+        if new_node.key < node.key:
+            node.left = self._insert(node.left, new_node)
+            if node.left.priority > node.priority:
+                node = self._rotate_right(node)
+        else:
+            node.right = self._insert(node.right, new_node)
+            if node.right.priority > node.priority:
+                node = self._rotate_left(node)
+        node.update()
+        return node
+
+    def remove(self, start, id):
+        self.root, removed = self._remove(self.root, (start, id))
+        if removed:
+            self.size -= 1
+        return removed
+
+    def _remove(self, node, key):
+        if node is None:
+            return None, False
+        if key < node.key:
+            node.left, removed = self._remove(node.left, key)
+        elif key > node.key:
+            node.right, removed = self._remove(node.right, key)
+        else:
+            return self._merge(node.left, node.right), True
+        node.update()
+        return node, removed
+
+    def _merge(self, left, right):
+        if left is None:
+            return right
+        if right is None:
+            return left
+        if left.priority > right.priority:
+            left.right = self._merge(left.right, right)
+            left.update()
+            return left
+        right.left = self._merge(left, right.left)
+        right.update()
+        return right
+
+    def _rotate_right(self, node):
+        child = node.left
+        node.left = child.right
+        node.update()
+        child.right = node
+        child.update()
+        return child
+
+    def _rotate_left(self, node):
+        child = node.right
+        node.right = child.left
+        node.update()
+        child.left = node
+        child.update()
+        return child
+
+    # intervals: (start, end, id, value), replaces the content of the tree in O(n log n)
+    def rebuild(self, intervals):
+        ordered = sorted(intervals, key=lambda interval: (interval[0], interval[2]))
+        # cartesian tree over the sorted keys, built with a stack
+        stack = []
+        for start, end, id, value in ordered:
+            node = IntervalNode((start, id), end, value, random.random())
+            last = None
+            while stack and stack[-1].priority < node.priority:
+                last = stack.pop()
+            node.left = last
+            if stack:
+                stack[-1].right = node
+            stack.append(node)
+        self.root = stack[0] if stack else None
+        self._update_subtree(self.root)
+        self.size = len(ordered)
+
+    def _update_subtree(self, node):
+        if node is None:
+            return
+        self._update_subtree(node.left)
+        self._update_subtree(node.right)
+        node.update()
+
+    # values of the intervals overlapping [start, end)
+    def overlaps(self, start, end):
+        found = []
+        self._overlaps(self.root, start, end, found)
+        return found
+
+    def _overlaps(self, node, start, end, found):
+        if node is None or node.max_end <= start:
+            return
+        self._overlaps(node.left, start, end, found)
+        if node.key[0] < end:
+            if node.end > start:
+                found.append(node.value)
+            self._overlaps(node.right, start, end, found)
@@ -1,5 +1,6 @@
 
 class Movie:
+    __slots__ = ("id", "title", "duration", "rating", "description")
     
     def __init__(self, id, title, duration, rating, description):
         self.id = id
@@ -1,15 +1,56 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+import struct
+import sys
+
+# timestamps are kept as whole seconds since this (naive) moment
+EPOCH = datetime(1970, 1, 1)
 
 class Reservation:
+    # compact layout: there can be millions of reservations in memory
+    __slots__ = ("id", "screening_id", "customer_name", "customer_email", "packed_seats", "epoch_seconds")
 
     def __init__(self, id, screening_id, customer_name, customer_email, seats):
         
         self.id = id
         self.screening_id = screening_id
-        self.customer_name = customer_name
-        self.customer_email = customer_email
+        # the same customers book again and again, share their strings
+        self.customer_name = sys.intern(customer_name)
+        self.customer_email = sys.intern(customer_email)
         self.seats = seats
         self.timestamp = datetime.now()
+
+    # from stored fields, the seats already packed
+    @classmethod
+    def from_packed(cls, id, screening_id, customer_name, customer_email, packed_seats, epoch_seconds):
+        reservation = cls.__new__(cls)
+        reservation.id = id
+        reservation.screening_id = screening_id
+        reservation.customer_name = sys.intern(customer_name)
+        reservation.customer_email = sys.intern(customer_email)
+        reservation.packed_seats = packed_seats
+        reservation.epoch_seconds = epoch_seconds
+        return reservation
+
+    # seats are packed as unsigned 16 bit row, col pairs
+    @property
+    def seats(self):
+        values = struct.unpack(f"<{len(self.packed_seats) // 2}H", self.packed_seats)
+        return list(zip(values[0::2], values[1::2]))
+
+    @seats.setter
+    def seats(self, seats):
+        self.packed_seats = struct.pack(f"<{2 * len(seats)}H", *[value for seat in seats for value in seat])
+
+    def seat_count(self):
+        return len(self.packed_seats) // 4
+
+    @property
+    def timestamp(self):
+        return EPOCH + timedelta(seconds=self.epoch_seconds)
+
+    @timestamp.setter
+    def timestamp(self, timestamp):
+        self.epoch_seconds = int((timestamp - EPOCH).total_seconds())
         
     def get_total_price(self, screening):
-        return len(self.seats) * screening.price
\ No newline at end of file
+        return self.seat_count() * screening.price
@@ -0,0 +1,107 @@
+import bisect
+
+'''
+Schedule Index
+screenings sorted by start time, overall, per room and per movie
+'''
+class Timeline:
+    __slots__ = ("keys", "screenings")
+
+    def __init__(self):
+        self.keys = [] # (start_time, screening id), sorted
+        self.screenings = []
+
+    def add(self, screening):
+        key = (screening.start_time, screening.id)
+        position = bisect.bisect_right(self.keys, key)
+        self.keys.insert(position, key)
+        self.screenings.insert(position, screening)
+
+    def remove(self, screening):
+        key = (screening.start_time, screening.id)
+        position = bisect.bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            del self.keys[position]
+            del self.screenings[position]
+
+    # replace the content with screenings, sorted once
+    def rebuild(self, screenings):
+        ordered = sorted(screenings, key=lambda s: (s.start_time, s.id))
+        self.keys = [(s.start_time, s.id) for s in ordered]
+        self.screenings = ordered
+
+    # screenings starting in [start, end)
+    def between(self, start, end):
+        low = bisect.bisect_left(self.keys, (start,))
+        high = bisect.bisect_left(self.keys, (end,))
+        return self.screenings[low:high]
+
+    # the next count screenings starting at or after start
+    def upcoming(self, start, count):
+        low = bisect.bisect_left(self.keys, (start,))
+        return self.screenings[low:low + count]
+
+    # screenings starting at or after start, in order, without copying the list
+    def iter_from(self, start):
+        low = bisect.bisect_left(self.keys, (start,))
+        for position in range(low, len(self.screenings)):
+            yield self.screenings[position]
+
+    def all(self):
+        return list(self.screenings)
+
+    def __len__(self):
+        return len(self.keys)
+
+
+EMPTY = Timeline()
+
+class ScheduleIndex:
+    def __init__(self):
+        self.timeline = Timeline()
+        self.by_room = {}
+        self.by_movie = {}
+
+    def add(self, screening):
+        self.timeline.add(screening)
+        self.by_room.setdefault(screening.room_id, Timeline()).add(screening)
+        self.by_movie.setdefault(screening.movie_id, Timeline()).add(screening)
+
+    def remove(self, screening):
+        self.timeline.remove(screening)
+        self.by_room.get(screening.room_id, EMPTY).remove(screening)
+        self.by_movie.get(screening.movie_id, EMPTY).remove(screening)
+
+    def rebuild(self, screenings):
+        self.timeline.rebuild(screenings)
+        by_room = {}
+        by_movie = {}
+        for screening in screenings:
+            by_room.setdefault(screening.room_id, []).append(screening)
+            by_movie.setdefault(screening.movie_id, []).append(screening)
+        self.by_room = {room_id: Timeline() for room_id in by_room}
+        for room_id, room_screenings in by_room.items():
+            self.by_room[room_id].rebuild(room_screenings)
+        self.by_movie = {movie_id: Timeline() for movie_id in by_movie}
+        for movie_id, movie_screenings in by_movie.items():
+            self.by_movie[movie_id].rebuild(movie_screenings)
+
+    # timeline of one room or movie, or of all screenings
+    def select(self, room_id=None, movie_id=None):
+        if room_id is not None and movie_id is not None:
+            # the smaller timeline, filtered by the other criterion
+            timeline = min(self.by_room.get(room_id, EMPTY), self.by_movie.get(movie_id, EMPTY), key=len)
+            filtered = Timeline()
+            filtered.rebuild([s for s in timeline.screenings if s.room_id == room_id and s.movie_id == movie_id])
+            return filtered
+        if room_id is not None:
+            return self.by_room.get(room_id, EMPTY)
+        if movie_id is not None:
+            return self.by_movie.get(movie_id, EMPTY)
+        return self.timeline
+
+    def between(self, start, end, room_id=None, movie_id=None):
+        return self.select(room_id, movie_id).between(start, end)
+
+    def upcoming(self, start, count, room_id=None, movie_id=None):
+        return self.select(room_id, movie_id).upcoming(start, count)
@@ -1,25 +1,189 @@
+from models.SeatMap import SeatMap
+from models.SeatRunIndex import SeatRunIndex
+
+import threading
+
 class Screening:
+    __slots__ = ("id", "movie_id", "room_id", "start_time", "price", "seat_map", "held_map", "holds", "seat_runs", "availability", "lock")
 
-    def __init__(self, id, movie_id, room_id, start_time, price):
+    def __init__(self, id, movie_id, room_id, start_time, price, room=None):
         self.id = id
         self.movie_id = movie_id
         self.room_id = room_id
         self.start_time = start_time
         self.price = price
-        self.reserved_seats = set() # seats which have been reserved
+        self.seat_map = None # seats which have been reserved, sized from the room
+        self.held_map = None # seats temporarily held during checkout
+        self.holds = {} # hold id -> held seats
+        self.seat_runs = None # free runs of seats per row, built on first use
+        self.availability = None # AvailabilityCache of the cinema, told about every seat change
+        self.lock = threading.Lock() # guards the seat maps during reservations and holds
+        if room:
+            self.attach_room(room)
+
+    def attach_room(self, room):
+        if self.seat_map and (self.seat_map.rows, self.seat_map.cols) == (room.rows, room.cols):
+            return
+        old_map = self.seat_map
+        self.seat_map = SeatMap(room.rows, room.cols)
+        self.held_map = SeatMap(room.rows, room.cols)
+        self.seat_runs = None
+        if old_map:
+            for seat in old_map.iter_reserved():
+                if self.seat_map.index(seat) is not None:
+                    self.seat_map.reserve(seat)
+        for seats in self.holds.values():
+            for seat in seats:
+                if self.held_map.index(seat) is not None:
+                    self.held_map.reserve(seat)
+        if self.availability:
+            self.availability.add(self)
+
+    def _require_seat_map(self):
+        if not self.seat_map:
+            raise ValueError(f"Screening {self.id} has no screening room attached")
+        return self.seat_map
+
+    @property
+    def reserved_seats(self):
+        if not self.seat_map:
+            return set()
+        return set(self.seat_map.iter_reserved())
+
+    @reserved_seats.setter
+    def reserved_seats(self, seats):
+        seat_map = self._require_seat_map()
+        seat_map.clear()
+        for seat in seats:
+            seat_map.reserve(seat)
+        self.seat_runs = None
+        if self.availability:
+            self.availability.add(self)
 
     # seat in (row, col)
     def is_seat_available(self, seat):
-        return seat not in self.reserved_seats
+        seat_map = self._require_seat_map()
+        return seat_map.index(seat) is not None and not seat_map.is_reserved(seat) and not self.held_map.is_reserved(seat)
 
-    # reserve seats, return True if it's available
-    def reserve_seats(self, seats):
+    # seats that cannot be taken, seats held by own_hold_id count as free
+    def _find_conflicts(self, seats, own_hold_id=None):
+        seat_map = self._require_seat_map()
+        own_seats = self.holds.get(own_hold_id, ())
+        conflicts = []
+        requested = set()
         for seat in seats:
-            if self.is_seat_available(seat):
-                self.reserved_seats.add(seat)
-                return True
-        return False
+            if (seat in requested or seat_map.index(seat) is None or seat_map.is_reserved(seat)
+                    or (self.held_map.is_reserved(seat) and seat not in own_seats)):
+                conflicts.append(seat)
+            requested.add(seat)
+        return conflicts
+
+    # reserve all seats or none of them, return the seats that are not available
+    # with hold_id the seats of that hold can be reserved and the hold is released
+    def try_reserve_seats(self, seats, hold_id=None):
+        with self.lock:
+            conflicts = self._find_conflicts(seats, hold_id)
+            if conflicts:
+                return conflicts
+            if hold_id in self.holds:
+                self._release_hold(hold_id)
+            for seat in seats:
+                self.seat_map.reserve(seat)
+            if self.seat_runs:
+                for seat in seats:
+                    self.seat_runs.take(seat)
+            if self.availability:
+                self.availability.update(self, len(seats), 0)
+            return []
+
+    # free reserved seats again (cancellation), return the seats that were released
+    def release_seats(self, seats):
+        with self.lock:
+            seat_map = self._require_seat_map()
+            released = []
+            for seat in seats:
+                if seat_map.is_reserved(seat):
+                    seat_map.release(seat)
+                    released.append(seat)
+            if self.seat_runs:
+                for seat in released:
+                    if not self.held_map.is_reserved(seat):
+                        self.seat_runs.free(seat)
+            if released and self.availability:
+                self.availability.update(self, -len(released), 0)
+            return released
+
+    # hold all seats or none of them, return the seats that are not available
+    def try_hold_seats(self, hold_id, seats):
+        with self.lock:
+            conflicts = self._find_conflicts(seats)
+            if conflicts:
+                return conflicts
+            self._hold_seats(hold_id, seats)
+            return []
+
+    def _hold_seats(self, hold_id, seats):
+        self.holds[hold_id] = tuple(seats)
+        for seat in seats:
+            self.held_map.reserve(seat)
+        if self.seat_runs:
+            for seat in seats:
+                self.seat_runs.take(seat)
+        if self.availability:
+            self.availability.update(self, 0, len(seats))
+
+    # return the seats of the hold, empty if it was already released
+    def release_hold(self, hold_id):
+        with self.lock:
+            return self._release_hold(hold_id)
+
+    def _release_hold(self, hold_id):
+        seats = self.holds.pop(hold_id, ())
+        for seat in seats:
+            self.held_map.release(seat)
+        if self.seat_runs:
+            for seat in seats:
+                if not self.seat_map.is_reserved(seat):
+                    self.seat_runs.free(seat)
+        if seats and self.availability:
+            self.availability.update(self, 0, -len(seats))
+        return seats
+
+    # seats that are reserved or held
+    def _occupied_map(self):
+        if not self.holds:
+            return self.seat_map
+        return self.seat_map.union(self.held_map)
+
+    # index of the seats that are neither reserved nor held
+    def _seat_runs(self):
+        if not self.seat_runs:
+            self._require_seat_map()
+            self.seat_runs = SeatRunIndex.from_seat_map(self._occupied_map())
+        return self.seat_runs
+
+    # the best count adjacent free seats in one row, empty if there are none
+    def find_best_seats(self, count):
+        with self.lock:
+            return self._seat_runs().best(count) or []
+
+    # hold the best count adjacent free seats, return them, empty if there are none
+    def try_hold_best_seats(self, hold_id, count):
+        with self.lock:
+            seats = self._seat_runs().best(count)
+            if not seats:
+                return []
+            self._hold_seats(hold_id, seats)
+            return seats
+
+    # reserve seats, return True if all of them were available
+    def reserve_seats(self, seats):
+        return not self.try_reserve_seats(seats)
     
     def get_available_seats(self, room):
-        all_seats = [(row, col) for row in range(1, room.rows + 1) for col in range(1, room.cols + 1)]
-        return [seat for seat in all_seats if seat not in self.reserved_seats]
\ No newline at end of file
+        self.attach_room(room)
+        return list(self._occupied_map().iter_free())
+
+    def get_available_seat_count(self, room):
+        self.attach_room(room)
+        return self._occupied_map().free_count()
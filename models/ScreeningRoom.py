@@ -2,6 +2,8 @@
 Screening Room
 '''
 class ScreeningRoom:
+    __slots__ = ("id", "name", "rows", "cols")
+
     def __init__(self, id, name, rows, cols):
         self.id = id
         self.name = name
@@ -0,0 +1,12 @@
+
+class SeatHold:
+    __slots__ = ("id", "screening_id", "seats", "expires_at")
+
+    def __init__(self, id, screening_id, seats, expires_at):
+        self.id = id
+        self.screening_id = screening_id
+        self.seats = seats
+        self.expires_at = expires_at # time.monotonic() value
+
+    def is_expired(self, now):
+        return now >= self.expires_at
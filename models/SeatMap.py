@@ -0,0 +1,94 @@
+'''
+Seat Map
+one bit per seat, seat (row, col) is bit (row - 1) * cols + (col - 1)
+'''
+# positions of the free (0) bits for every possible byte value
+FREE_BITS = [tuple(bit for bit in range(8) if not value >> bit & 1) for value in range(256)]
+
+class SeatMap:
+    __slots__ = ("rows", "cols", "bits")
+
+    def __init__(self, rows, cols, data=None):
+        self.rows = rows
+        self.cols = cols
+        size = (rows * cols + 7) // 8
+        if data is None:
+            self.bits = bytearray(size)
+        else:
+            if len(data) != size:
+                raise ValueError(f"Seat map data has {len(data)} bytes, expected {size}")
+            self.bits = bytearray(data)
+
+    def get_total_seats(self):
+        return self.rows * self.cols
+
+    # index of the seat, None for seats outside the room
+    def index(self, seat):
+        row, col = seat
+        if 1 <= row <= self.rows and 1 <= col <= self.cols:
+            return (row - 1) * self.cols + (col - 1)
+        return None
+
+    def seat(self, index):
+        row, col = divmod(index, self.cols)
+        return (row + 1, col + 1)
+
+    def is_reserved(self, seat):
+        index = self.index(seat)
+        if index is None:
+            return False
+        return bool(self.bits[index >> 3] >> (index & 7) & 1)
+
+    def reserve(self, seat):
+        index = self.index(seat)
+        if index is None:
+            raise ValueError(f"Seat {seat} is outside the screening room")
+        self.bits[index >> 3] |= 1 << (index & 7)
+
+    def release(self, seat):
+        index = self.index(seat)
+        if index is None:
+            raise ValueError(f"Seat {seat} is outside the screening room")
+        self.bits[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+
+    def clear(self):
+        self.bits = bytearray(len(self.bits))
+
+    def reserved_count(self):
+        return int.from_bytes(self.bits, "little").bit_count()
+
+    def free_count(self):
+        return self.get_total_seats() - self.reserved_count()
+
+    def iter_reserved(self):
+        total = self.get_total_seats()
+        for byte_index, value in enumerate(self.bits):
+            if not value:
+                continue
+            for bit in range(8):
+                if value >> bit & 1:
+                    index = (byte_index << 3) + bit
+                    if index < total:
+                        yield self.seat(index)
+
+    # whole bytes of reserved seats are skipped without looking at single bits
+    def iter_free(self):
+        total = self.get_total_seats()
+        for byte_index, value in enumerate(self.bits):
+            if value == 0xFF:
+                continue
+            base = byte_index << 3
+            for bit in FREE_BITS[value]:
+                index = base + bit
+                if index >= total:
+                    break
+                yield self.seat(index)
+
+    # new map with the seats taken in either map
+    def union(self, other):
+        size = len(self.bits)
+        bits = int.from_bytes(self.bits, "little") | int.from_bytes(other.bits, "little")
+        return SeatMap(self.rows, self.cols, bits.to_bytes(size, "little"))
+
+    def to_bytes(self):
+        return bytes(self.bits)
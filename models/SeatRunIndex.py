@@ -0,0 +1,135 @@
+import bisect
+
+'''
+Seat Run Index
+runs of adjacent free seats per row, kept up to date seat by seat as seats
+are taken and freed. best(count) looks for the block of count adjacent seats
+closest to the centre of the room, visiting the rows from the centre outwards
+and only the runs that are long enough.
+'''
+class SeatRunIndex:
+    __slots__ = ("rows", "cols", "starts", "ends", "longest")
+
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+        # per row (index row - 1): sorted first and last columns of the free runs
+        self.starts = [[1] if cols else [] for _ in range(rows)]
+        self.ends = [[cols] if cols else [] for _ in range(rows)]
+        self.longest = [cols] * rows
+
+    # index of the seats that are not taken in seat_map
+    @classmethod
+    def from_seat_map(cls, seat_map):
+        index = cls(seat_map.rows, seat_map.cols)
+        bits = int.from_bytes(seat_map.bits, "little")
+        for row in range(seat_map.rows):
+            row_bits = bits >> (row * seat_map.cols)
+            starts = []
+            ends = []
+            start = None
+            for col in range(1, seat_map.cols + 1):
+                if row_bits >> (col - 1) & 1:
+                    if start is not None:
+                        starts.append(start)
+                        ends.append(col - 1)
+                        start = None
+                elif start is None:
+                    start = col
+            if start is not None:
+                starts.append(start)
+                ends.append(seat_map.cols)
+            index.starts[row] = starts
+            index.ends[row] = ends
+            index._update_longest(row)
+        return index
+
+    def _update_longest(self, row):
+        starts = self.starts[row]
+        ends = self.ends[row]
+        self.longest[row] = max((end - start + 1 for start, end in zip(starts, ends)), default=0)
+
+    # position of the run holding col, None if the seat is taken
+    def _find_run(self, row, col):
+        position = bisect.bisect_right(self.starts[row], col) - 1
+        if position >= 0 and self.ends[row][position] >= col:
+            return position
+        return None
+
+    def take(self, seat):
+        row, col = seat[0] - 1, seat[1]
+        if not 0 <= row < self.rows:
+            return
+        position = self._find_run(row, col)
+        if position is None:
+            return
+        starts = self.starts[row]
+        ends = self.ends[row]
+        start, end = starts[position], ends[position]
+        del starts[position]
+        del ends[position]
+        if col < end:
+            starts.insert(position, col + 1)
+            ends.insert(position, end)
+        if start < col:
+            starts.insert(position, start)
+            ends.insert(position, col - 1)
+        if end - start + 1 == self.longest[row]:
+            self._update_longest(row)
+
+    def free(self, seat):
+        row, col = seat[0] - 1, seat[1]
+        if not (0 <= row < self.rows and 1 <= col <= self.cols) or self._find_run(row, col) is not None:
+            return
+        starts = self.starts[row]
+        ends = self.ends[row]
+        position = bisect.bisect_left(starts, col)
+        start = end = col
+        # merge with the runs ending right before and starting right after the seat
+        if position < len(starts) and starts[position] == col + 1:
+            end = ends[position]
+            del starts[position]
+            del ends[position]
+        if position > 0 and ends[position - 1] == col - 1:
+            position -= 1
+            start = starts[position]
+            del starts[position]
+            del ends[position]
+        starts.insert(position, start)
+        ends.insert(position, end)
+        if end - start + 1 > self.longest[row]:
+            self.longest[row] = end - start + 1
+
+    def free_count(self):
+        return sum(end - start + 1 for starts, ends in zip(self.starts, self.ends) for start, end in zip(starts, ends))
+
+    # count adjacent free seats in one row closest to the centre of the room,
+    # None if no row has that many seats free next to each other
+    def best(self, count):
+        if count < 1:
+            return None
+        centre_row = (self.rows - 1) / 2 # row index
+        centre_col = (self.cols + 1) / 2
+        # rows ordered by distance from the centre row
+        rows = sorted(range(self.rows), key=lambda row: (abs(row - centre_row), row))
+        best_score = None
+        best_block = None
+        for row in rows:
+            row_score = (row - centre_row) ** 2
+            if best_score is not None and row_score >= best_score:
+                break
+            if self.longest[row] < count:
+                continue
+            for start, end in zip(self.starts[row], self.ends[row]):
+                if end - start + 1 < count:
+                    continue
+                # first column of the block centred on the room, moved into the run
+                first = min(max(round(centre_col - (count - 1) / 2), start), end - count + 1)
+                score = row_score + (first + (count - 1) / 2 - centre_col) ** 2
+                if best_score is None or score < best_score:
+                    best_score = score
+                    best_block = (row + 1, first)
+        if best_block is None:
+            return None
+        row, first = best_block
+        return [(row, col) for col in range(first, first + count)]
@@ -1,4 +1,10 @@
 from .Movie import Movie
 from .ScreeningRoom import ScreeningRoom
 from .Screening import Screening
-from .Reservation import Reservation
\ No newline at end of file
+from .Reservation import Reservation
+from .SeatMap import SeatMap
+from .ScheduleIndex import ScheduleIndex
+from .IntervalTree import IntervalTree
+from .SeatRunIndex import SeatRunIndex
+from .AvailabilityCache import AvailabilityCache
+from .CustomerIndex import CustomerIndex
\ No newline at end of file
@@ -0,0 +1,82 @@
+import asyncio
+import itertools
+import json
+
+# longest request or response line; one line can carry a whole schedule or a
+# group booking, far beyond the 64 KiB asyncio allows by default
+LINE_LIMIT = 16 * 2**20
+
+'''
+Booking Client
+asyncio client for BookingService, several calls can be in flight on one
+connection at the same time.
+
+    client = BookingClient()
+    await client.connect("127.0.0.1", service.port)
+    reservation = await client.call("make_reservation", screening_id=1, ...)
+'''
+class BookingServiceError(Exception):
+    pass
+
+
+class BookingClient:
+    def __init__(self):
+        self.reader = None
+        self.writer = None
+        self.pending = {}
+        self.request_ids = itertools.count(1)
+        self.reader_task = None
+        self.closed = False
+
+    async def connect(self, host, port):
+        self.reader, self.writer = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+        self.closed = False
+        self.reader_task = asyncio.create_task(self.read_responses())
+
+    async def close(self):
+        if self.writer:
+            self.writer.close()
+            await self.writer.wait_closed()
+            self.writer = None
+        if self.reader_task:
+            await self.reader_task
+            self.reader_task = None
+
+    async def read_responses(self):
+        reason = "Connection closed"
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                response = json.loads(line)
+                if response.get("id") is None and not response.get("ok"):
+                    # the server could not tell which request failed, it closes the connection next
+                    reason = response.get("error", reason)
+                future = self.pending.pop(response.get("id"), None)
+                if future and not future.done():
+                    future.set_result(response)
+        except (ValueError, ConnectionError) as e:
+            # a line over the limit or a broken connection, nothing after it can be read
+            reason = f"Connection lost: {e}"
+        finally:
+            # fail whatever is still waiting, and every call made from now on
+            self.closed = True
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(BookingServiceError(reason))
+            self.pending.clear()
+
+    # return the result, raise BookingServiceError with the server's message on failure
+    async def call(self, method, **params):
+        if self.closed:
+            raise BookingServiceError("Connection closed")
+        request_id = next(self.request_ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        self.writer.write((json.dumps({"id": request_id, "method": method, "params": params}) + "\n").encode())
+        await self.writer.drain()
+        response = await future
+        if not response["ok"]:
+            raise BookingServiceError(response["error"])
+        return response["result"]
@@ -0,0 +1,260 @@
+from models.Cinema import Cinema
+from data_storage.JournalStorage import JournalStorage
+from logics.ReservationManager import ReservationManager
+from logics.AdminManager import AdminManager
+from instrumentation.Metrics import metrics
+from service.BookingClient import LINE_LIMIT
+
+import asyncio
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+'''
+Booking Service
+asyncio server exposing ReservationManager and AdminManager without the
+tkinter UI. Line protocol: every request is one JSON object per line
+    {"id": 1, "method": "make_reservation", "params": {...}}
+and gets one JSON line back
+    {"id": 1, "ok": true, "result": ...} or {"id": 1, "ok": false, "error": "..."}
+Requests on one connection are handled concurrently, responses carry the
+request id. Persistence runs in a thread pool so the event loop never
+waits for the disk.
+'''
+class BookingService:
+    def __init__(self, cinema, data_storage=None, persistence_workers=1):
+        self.cinema = cinema
+        self.data_storage = data_storage
+        self.reservation_manager = ReservationManager(cinema)
+        self.admin_manager = AdminManager(cinema)
+        # one worker keeps the records in the order they were committed
+        self.executor = ThreadPoolExecutor(max_workers=persistence_workers)
+        self.server = None
+        self.methods = {
+            "list_movies": self.list_movies,
+            "list_screenings": self.list_screenings,
+            "list_upcoming": self.list_upcoming,
+            "get_screening": self.get_screening,
+            "make_reservation": self.make_reservation,
+            "make_reservations": self.make_reservations,
+            "get_reservations": self.get_reservations,
+            "find_reservations": self.find_reservations,
+            "cancel_reservation": self.cancel_reservation,
+            "add_movie": self.add_movie,
+            "add_screening": self.add_screening,
+            "get_metrics": self.get_metrics,
+        }
+
+    async def start(self, host="127.0.0.1", port=0):
+        self.server = await asyncio.start_server(self.handle_connection, host, port, limit=LINE_LIMIT)
+        return self.server
+
+    @property
+    def port(self):
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        await asyncio.get_running_loop().run_in_executor(self.executor, self._close_storage)
+        self.executor.shutdown(wait=True)
+
+    def _close_storage(self):
+        if self.data_storage:
+            self.data_storage.close()
+
+    # save_method is one of the DataStorage save_* methods, e.g. "save_reservation"
+    async def persist(self, save_method, record):
+        if self.data_storage:
+            save = getattr(self.data_storage, save_method)
+            await asyncio.get_running_loop().run_in_executor(self.executor, save, self.cinema, record)
+
+    async def handle_connection(self, reader, writer):
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    # the rest of the connection can't be split into requests any more
+                    await self.send(writer, write_lock, {"id": None, "ok": False, "error": f"Request longer than {LINE_LIMIT} bytes"})
+                    break
+                if not line:
+                    break
+                task = asyncio.create_task(self.handle_line(line, writer, write_lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    async def handle_line(self, line, writer, write_lock):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            method = self.methods.get(request.get("method"))
+            if not method:
+                raise ValueError(f"Unknown method {request.get('method')}")
+            response = {"id": request_id, "ok": True, "result": await method(**request.get("params", {}))}
+        except Exception as e:
+            response = {"id": request_id, "ok": False, "error": str(e)}
+        await self.send(writer, write_lock, response)
+
+    async def send(self, writer, write_lock, response):
+        async with write_lock:
+            writer.write((json.dumps(response) + "\n").encode())
+            await writer.drain()
+
+    def movie_to_dict(self, movie):
+        return {"id": movie.id, "title": movie.title, "duration": movie.duration, "rating": movie.rating, "description": movie.description}
+
+    def screening_to_dict(self, screening):
+        room = self.cinema.get_screening_room_by_id(screening.room_id)
+        availability = self.cinema.get_screening_availability(screening.id)
+        return {
+            "id": screening.id,
+            "movie_id": screening.movie_id,
+            "room_id": screening.room_id,
+            "room_name": room.name if room else None,
+            "start_time": screening.start_time.strftime("%Y-%m-%d %H:%M"),
+            "price": screening.price,
+            "available_seats": availability.free if availability else 0,
+            "total_seats": availability.capacity if availability else 0
+        }
+
+    def reservation_to_dict(self, reservation):
+        return {
+            "id": reservation.id,
+            "screening_id": reservation.screening_id,
+            "customer_name": reservation.customer_name,
+            "customer_email": reservation.customer_email,
+            "seats": [list(seat) for seat in reservation.seats],
+            "timestamp": reservation.timestamp.strftime("%Y-%m-%d %H:%M:%S")
+        }
+
+    # JSON has no tuples, seats arrive as [row, col] lists
+    def seats_from_params(self, seats):
+        if not isinstance(seats, (list, tuple)) or not all(isinstance(seat, (list, tuple)) for seat in seats):
+            raise ValueError("seats must be a list of [row, col] pairs")
+        return [tuple(seat) for seat in seats]
+
+    async def list_movies(self):
+        return [self.movie_to_dict(m) for m in self.cinema.get_movies()]
+
+    async def list_screenings(self, movie_id):
+        return [self.screening_to_dict(s) for s in self.cinema.get_screenings_by_movie(movie_id)]
+
+    # the next screenings from start_time ("YYYY-MM-DD HH:MM", default now) with seats left
+    async def list_upcoming(self, start_time=None, count=20, min_seats=1, movie_id=None):
+        start = datetime.strptime(start_time, "%Y-%m-%d %H:%M") if start_time else datetime.now()
+        screenings = self.cinema.get_upcoming_with_seats(start, count, min_seats, movie_id=movie_id)
+        return [self.screening_to_dict(s) for s in screenings]
+
+    async def get_screening(self, screening_id, include_seats=False):
+        screening = self.cinema.get_screening_by_id(screening_id)
+        if not screening:
+            raise ValueError("The screening doesn't exist")
+        result = self.screening_to_dict(screening)
+        if include_seats:
+            room = self.cinema.get_screening_room_by_id(screening.room_id)
+            result["free_seats"] = [list(seat) for seat in screening.get_available_seats(room)]
+        return result
+
+    async def make_reservation(self, screening_id, customer_name, customer_email, seats):
+        success, result = self.reservation_manager.make_reservation(
+            screening_id, customer_name, customer_email, self.seats_from_params(seats)
+        )
+        if not success:
+            raise ValueError(result)
+        await self.persist("save_reservation", result)
+        return self.reservation_to_dict(result)
+
+    # reservations: list of {screening_id, customer_name, customer_email, seats},
+    # one result per reservation, all new reservations are saved in one write
+    async def make_reservations(self, reservations):
+        results = self.reservation_manager.make_reservations([
+            (r["screening_id"], r["customer_name"], r["customer_email"], self.seats_from_params(r["seats"]))
+            for r in reservations
+        ])
+        booked = [result for success, result in results if success]
+        if booked:
+            await self.persist("save_changes", {"reservations": booked})
+        return [
+            {"ok": True, "result": self.reservation_to_dict(result)} if success else {"ok": False, "error": result}
+            for success, result in results
+        ]
+
+    async def get_reservations(self, screening_id):
+        return [self.reservation_to_dict(r) for r in self.cinema.get_reservations_by_screening(screening_id)]
+
+    # by customer email, or by the start of the customer name; sorted by screening time
+    async def find_reservations(self, email=None, name=None):
+        if email:
+            reservations = self.cinema.get_reservations_by_email(email)
+        elif name:
+            reservations = self.cinema.find_reservations_by_name(name)
+        else:
+            raise ValueError("Give an email or a name")
+        return [self.reservation_to_dict(r) for r in reservations]
+
+    # seats: the seats to give back, all of them when left out
+    async def cancel_reservation(self, reservation_id, seats=None):
+        reservation = self.cinema.get_reservation_by_id(reservation_id)
+        if not reservation:
+            raise ValueError("The reservation doesn't exist")
+        if seats is None:
+            success, result = self.reservation_manager.cancel_reservation(reservation_id)
+        else:
+            success, result = self.reservation_manager.cancel_seats(reservation_id, self.seats_from_params(seats))
+        if not success:
+            raise ValueError(result)
+        await self.persist("save_cancellation", reservation)
+        return {"id": reservation.id, "refund": result, "seats": [list(seat) for seat in reservation.seats]}
+
+    async def add_movie(self, title, duration, rating, description=""):
+        movie = self.admin_manager.add_movie(title, int(duration), rating, description)
+        await self.persist("save_movie", movie)
+        return self.movie_to_dict(movie)
+
+    async def add_screening(self, movie_id, room_id, start_time, price):
+        if not self.cinema.get_movie_by_id(movie_id):
+            raise ValueError("Movie not exists")
+        if not self.cinema.get_screening_room_by_id(room_id):
+            raise ValueError("Screening room doesn't exist")
+        start_time = datetime.strptime(start_time, "%Y-%m-%d %H:%M")
+        screening = self.admin_manager.add_screening(movie_id, room_id, start_time, float(price))
+        await self.persist("save_screening", screening)
+        return self.screening_to_dict(screening)
+
+    # format "json" or "text", see Metrics
+    async def get_metrics(self, format="json"):
+        return metrics.snapshot() if format == "json" else metrics.to_text()
+
+
+async def serve(filename, host, port):
+    data_storage = JournalStorage(filename, fast_start=True)
+    # a new cinema only when there is no file yet, an unreadable file raises DataStorageError
+    cinema = data_storage.load_data() or Cinema("CHENG Movie Theater")
+    service = BookingService(cinema, data_storage)
+    await service.start(host, port)
+    print(f"Booking service listening on {host}:{service.port}")
+    try:
+        await service.server.serve_forever()
+    finally:
+        await service.close()
+
+
+if __name__ == "__main__":
+    # python -m service.BookingService [port] [data file]
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    filename = sys.argv[2] if len(sys.argv) > 2 else "cinema_data.json"
+    try:
+        asyncio.run(serve(filename, "127.0.0.1", port))
+    except KeyboardInterrupt:
+        pass
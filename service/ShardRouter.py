@@ -0,0 +1,118 @@
+from models.Cinema import Cinema
+from data_storage.JournalStorage import JournalStorage
+from service.BookingService import BookingService
+from service.BookingClient import BookingServiceError
+
+import asyncio
+import multiprocessing
+import threading
+
+'''
+Shard Router
+sharded deployment for a chain of theatres: every Cinema and its data file
+is owned by one worker process, the router sends each call over a pipe to
+the process of the theatre it is for. Theatres book on different cores and a
+busy theatre only queues its own calls.
+
+    router = ShardRouter({"downtown": "downtown.json", "airport": "airport.json"})
+    router.start()
+    router.make_reservation("downtown", screening_id=1, customer_name=..., ...)
+    router.close()
+
+Calls take the same methods and parameters as BookingService and return the
+same results. Calls for one theatre are sent one at a time, calls for
+different theatres from different threads run in parallel.
+'''
+def shard_worker(cinema_name, filename, connection):
+    data_storage = JournalStorage(filename, fast_start=True)
+    # a new cinema only when there is no file yet, an unreadable file stops the worker
+    cinema = data_storage.load_data() or Cinema(cinema_name)
+    service = BookingService(cinema, data_storage)
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            request = connection.recv()
+            if request is None:
+                break
+            method_name, params = request
+            try:
+                method = service.methods.get(method_name)
+                if not method:
+                    raise ValueError(f"Unknown method {method_name}")
+                connection.send((True, loop.run_until_complete(method(**params))))
+            except Exception as e:
+                connection.send((False, str(e)))
+    finally:
+        loop.run_until_complete(service.close())
+        loop.close()
+        connection.close()
+
+
+class Shard:
+    def __init__(self, name, filename):
+        self.name = name
+        self.filename = filename
+        self.connection = None
+        self.process = None
+        self.lock = threading.Lock() # one call in flight per shard
+
+
+class ShardRouter:
+    # shards: theatre name -> data file of that theatre
+    def __init__(self, shards):
+        self.shards = {name: Shard(name, filename) for name, filename in shards.items()}
+
+    def start(self):
+        for shard in self.shards.values():
+            if shard.process:
+                continue
+            shard.connection, worker_connection = multiprocessing.Pipe()
+            shard.process = multiprocessing.Process(
+                target=shard_worker, args=(shard.name, shard.filename, worker_connection),
+                name=f"CinemaShard-{shard.name}", daemon=True
+            )
+            shard.process.start()
+            worker_connection.close()
+
+    # return the result, raise BookingServiceError with the shard's message on failure
+    def call(self, cinema_name, method, **params):
+        shard = self.shards.get(cinema_name)
+        if not shard:
+            raise BookingServiceError(f"Unknown cinema {cinema_name}")
+        if not shard.process:
+            raise BookingServiceError("The shard router is not started")
+        with shard.lock:
+            try:
+                shard.connection.send((method, params))
+                success, result = shard.connection.recv()
+            except (EOFError, OSError) as e:
+                raise BookingServiceError(f"Cinema {cinema_name} is not available: {e}")
+        if not success:
+            raise BookingServiceError(result)
+        return result
+
+    def make_reservation(self, cinema_name, screening_id, customer_name, customer_email, seats):
+        return self.call(cinema_name, "make_reservation", screening_id=screening_id,
+                         customer_name=customer_name, customer_email=customer_email, seats=seats)
+
+    def cancel_reservation(self, cinema_name, reservation_id, seats=None):
+        return self.call(cinema_name, "cancel_reservation", reservation_id=reservation_id, seats=seats)
+
+    def add_screening(self, cinema_name, movie_id, room_id, start_time, price):
+        return self.call(cinema_name, "add_screening", movie_id=movie_id, room_id=room_id,
+                         start_time=start_time, price=price)
+
+    # ask every worker to save and stop
+    def close(self):
+        for shard in self.shards.values():
+            if not shard.process:
+                continue
+            with shard.lock:
+                try:
+                    shard.connection.send(None)
+                except (BrokenPipeError, OSError):
+                    pass
+                shard.process.join()
+                shard.connection.close()
+                shard.process = None
+                shard.connection = None